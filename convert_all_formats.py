@@ -0,0 +1,223 @@
+"""
+Convert ranking training data to Vertex AI and Gemini formats in one pass.
+
+This script reads the structured JSONL file once and writes any of:
+- vertex_ready.jsonl: input_text/output_text records for Vertex AI
+- gemini_ready.jsonl: Gemini conversational records
+
+The files are the same as running convert_to_vertex_format.py followed by
+convert_to_gemini_format.py, without writing and re-parsing the
+intermediate Vertex file.
+"""
+import sys
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from convert_to_gemini_format import new_gemini_document
+from convert_to_vertex_format import (
+    REQUIRED_KEYS, RecordError, convert_records, format_prompt, merge_range_results,
+    remove_output
+)
+from src.jsonl_io import map_line_ranges, JSONLWriter
+
+# Output formats this script can emit, in the order they are written
+FORMATS = ('vertex', 'gemini')
+
+
+def _convert_range(
+    input_file: str,
+    output_files: Sequence[str],
+    start: int,
+    end: int,
+    emit: Sequence[str] = FORMATS,
+    verbose: bool = True,
+    trusted: bool = False
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """
+    Convert the records in one byte range of the input file to every format.
+    
+    Args:
+        input_file: Path to original JSONL file
+        output_files: Output paths, one per entry in emit
+        start: Offset of the first byte to convert (must start a line)
+        end: Offset one past the last byte to convert
+        emit: Formats to write
+        verbose: Print warnings and progress as they happen
+        trusted: Abort on the first bad record instead of skipping it
+        
+    Returns:
+        Tuple of (converted count, skipped count, warnings), see
+        convert_to_vertex_format.convert_records
+    """
+    # Both documents are filled in place and serialized immediately
+    vertex_doc = {"input_text": "", "output_text": ""}
+    gemini_doc, user_part, model_part = new_gemini_document()
+    
+    with ExitStack() as stack:
+        writers = {
+            fmt: stack.enter_context(JSONLWriter(stack.enter_context(open(path, "wb"))))
+            for fmt, path in zip(emit, output_files)
+        }
+        vertex_writer = writers.get('vertex')
+        gemini_writer = writers.get('gemini')
+        
+        def write_record(data: Dict[str, Any]) -> bool:
+            # Check for required fields
+            if not data.keys() >= REQUIRED_KEYS:
+                return False
+            
+            # The prompt and target are shared by both formats
+            prompt = format_prompt(
+                data['query'], data['category'], data['title'], data['rank'],
+                data['recency_score'], data['user_engagement_score']
+            )
+            response = str(data['relevance_score'])
+            
+            if vertex_writer is not None:
+                vertex_doc["input_text"] = prompt
+                vertex_doc["output_text"] = response
+                vertex_writer.write(vertex_doc)
+            
+            if gemini_writer is not None:
+                user_part["text"] = prompt
+                model_part["text"] = response
+                gemini_writer.write(gemini_doc)
+            
+            return True
+        
+        return convert_records(input_file, start, end, write_record, verbose, trusted)
+
+
+def convert_all(
+    input_file: str = "output/ranking_training_data.jsonl",
+    vertex_output: str = "output/vertex_ready.jsonl",
+    gemini_output: str = "output/gemini_ready.jsonl",
+    emit: Sequence[str] = FORMATS,
+    workers: int = 1,
+    trusted: bool = False
+):
+    """
+    Convert structured JSONL to the Vertex AI and Gemini formats in one pass.
+    
+    Args:
+        input_file: Path to original JSONL file
+        vertex_output: Path to output Vertex-ready JSONL file
+        gemini_output: Path to output Gemini-ready JSONL file
+        emit: Formats to write ('vertex' and/or 'gemini')
+        workers: Number of processes converting the file in parallel
+        trusted: Abort on the first bad record instead of skipping it
+    """
+    input_path = Path(input_file)
+    
+    unknown = [fmt for fmt in emit if fmt not in FORMATS]
+    if unknown or not emit:
+        print(f"❌ Error: --emit must list one or more of: {', '.join(FORMATS)}")
+        return False
+    
+    # Ensure input file exists
+    if not input_path.exists():
+        print(f"❌ Error: Input file not found: {input_file}")
+        print("   Run: python prepare_ranking_data.py")
+        return False
+    
+    # Keep a fixed order so the output list lines up with the worker's writers
+    emit = tuple(fmt for fmt in FORMATS if fmt in emit)
+    paths = {'vertex': vertex_output, 'gemini': gemini_output}
+    output_files = tuple(paths[fmt] for fmt in emit)
+    
+    # Ensure output directories exist
+    for output_file in output_files:
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    
+    print("=" * 60)
+    print("  Converting to Vertex AI and Gemini Formats")
+    print("=" * 60)
+    print()
+    print(f"Input:  {input_file}")
+    for fmt, output_file in zip(emit, output_files):
+        print(f"Output: {output_file} ({fmt})")
+    print()
+    
+    # Parallel workers report their warnings back instead of printing them
+    worker = partial(_convert_range, emit=emit, verbose=workers <= 1, trusted=trusted)
+    try:
+        results = map_line_ranges(worker, str(input_path), output_files, workers)
+    except RecordError as e:
+        # Records before the bad one were already written, drop them
+        remove_output(*output_files)
+        print(f"❌ Error: {e}")
+        print("   Run without --trusted to skip invalid records")
+        return False
+    converted_count, skipped_count = merge_range_results(results)
+    
+    print()
+    print("=" * 60)
+    print("  Conversion Complete!")
+    print("=" * 60)
+    print()
+    print(f"✓ Converted: {converted_count} documents")
+    
+    if skipped_count > 0:
+        print(f"⚠ Skipped: {skipped_count} documents (errors or missing fields)")
+    
+    print()
+    for output_file in output_files:
+        file_size = Path(output_file).stat().st_size
+        print(f"Output file: {output_file} ({file_size / 1024:.2f} KB)")
+    print()
+    
+    return True
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Convert ranking data to Vertex AI and Gemini formats in one pass"
+    )
+    parser.add_argument(
+        "--input",
+        default="output/ranking_training_data.jsonl",
+        help="Input JSONL file (default: output/ranking_training_data.jsonl)"
+    )
+    parser.add_argument(
+        "--vertex-output",
+        default="output/vertex_ready.jsonl",
+        help="Output Vertex-ready JSONL file (default: output/vertex_ready.jsonl)"
+    )
+    parser.add_argument(
+        "--gemini-output",
+        default="output/gemini_ready.jsonl",
+        help="Output Gemini-ready JSONL file (default: output/gemini_ready.jsonl)"
+    )
+    parser.add_argument(
+        "--emit",
+        default="vertex,gemini",
+        help="Comma-separated formats to write (default: vertex,gemini)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to convert with (default: 1)"
+    )
+    parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="Input is known to be clean: stop at the first invalid record instead of skipping it"
+    )
+    
+    args = parser.parse_args()
+    
+    emit = [fmt.strip() for fmt in args.emit.split(",") if fmt.strip()]
+    success = convert_all(
+        args.input, args.vertex_output, args.gemini_output, emit, args.workers, args.trusted
+    )
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
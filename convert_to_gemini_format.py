@@ -7,13 +7,179 @@ This script converts JSONL to Gemini's required format:
 - parts: array containing text
 """
 import json
+import shutil
 import sys
+from functools import partial
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from convert_to_vertex_format import (
+    REQUIRED_KEYS, RecordError, convert_records, format_prompt, merge_range_results,
+    remove_output
+)
+from src.jsonl_io import loads, map_line_ranges, JSONLWriter, JSONDecodeError
+
+_COMPLETE_BANNER = """
+============================================================
+  Conversion Complete!
+============================================================
+"""
+
+_NEXT_STEPS = """
+------------------------------------------------------------
+
+✓ Ready to upload to Google Cloud Storage!
+
+Next steps:
+  1. Upload to GCS:
+     gsutil cp {output_file} gs://your-bucket/gemini_ready.jsonl
+
+  2. Fine-tune Gemini:
+     ```python
+     import vertexai
+     from vertexai.tuning import sft
+
+     vertexai.init(
+         project="your-project-id",
+         location="us-central1"
+     )
+
+     sft_tuning_job = sft.train(
+         source_model="gemini-2.0-flash-001",
+         train_dataset="gs://your-bucket/gemini_ready.jsonl",
+         tuned_model_display_name="ranking-tuned-model"
+     )
+     ```
+"""
+
+
+def new_gemini_document() -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, str]]:
+    """
+    Create an empty Gemini conversational document.
+    
+    Returns:
+        Tuple of (document, user text part, model text part); setting "text"
+        on the two parts fills in the document
+    """
+    gemini_doc = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [
+                    {
+                        "text": ""
+                    }
+                ]
+            },
+            {
+                "role": "model",
+                "parts": [
+                    {
+                        "text": ""
+                    }
+                ]
+            }
+        ]
+    }
+    user_part = gemini_doc["contents"][0]["parts"][0]
+    model_part = gemini_doc["contents"][1]["parts"][0]
+    return gemini_doc, user_part, model_part
+
+
+def _texts_from_vertex_record(data: Dict[str, Any]) -> Tuple[str, str]:
+    """Return the (input, output) texts of a record already in Vertex AI format."""
+    return data["input_text"], data["output_text"]
+
+
+def _texts_from_structured_record(data: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """
+    Build the (input, output) texts for a structured ranking record.
+    
+    Returns:
+        The prompt and target score, or None if required fields are missing
+    """
+    if not data.keys() >= REQUIRED_KEYS:
+        return None
+    
+    prompt = format_prompt(
+        data['query'], data['category'], data['title'], data['rank'],
+        data['recency_score'], data['user_engagement_score']
+    )
+    return prompt, str(data['relevance_score'])
+
+
+def _convert_range(
+    input_file: str,
+    output_file: str,
+    start: int,
+    end: int,
+    verbose: bool = True,
+    trusted: bool = False
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """
+    Convert the records in one byte range of the input file.
+    
+    Args:
+        input_file: Path to vertex_ready.jsonl or structured JSONL
+        output_file: Path the converted records are written to
+        start: Offset of the first byte to convert (must start a line)
+        end: Offset one past the last byte to convert
+        verbose: Print warnings and progress as they happen
+        trusted: Abort on the first bad record instead of skipping it
+        
+    Returns:
+        Tuple of (converted count, skipped count, warnings), see
+        convert_to_vertex_format.convert_records
+    """
+    # The structure is the same for every record, so it is built once and
+    # only the two text parts are replaced before each (immediate) write
+    gemini_doc, user_part, model_part = new_gemini_document()
+    extract_texts = None
+    
+    with open(output_file, "wb") as outfile, JSONLWriter(outfile) as writer:
+        
+        def emit(data: Dict[str, Any]) -> bool:
+            nonlocal extract_texts
+            
+            # Input files hold a single format, so the first record picks
+            # the handler used for the rest of the range
+            if extract_texts is None:
+                if "input_text" in data and "output_text" in data:
+                    extract_texts = _texts_from_vertex_record
+                else:
+                    extract_texts = _texts_from_structured_record
+            
+            texts = extract_texts(data)
+            if texts is None:
+                return False
+            
+            # Fill in the Gemini conversational format
+            user_part["text"], model_part["text"] = texts
+            
+            writer.write(gemini_doc)
+            return True
+        
+        return convert_records(input_file, start, end, emit, verbose, trusted)
+
+
+def _is_gemini_file(path: Path) -> bool:
+    """Check whether the first record of a JSONL file is already in Gemini format."""
+    with open(path, "rb") as f:
+        first_line = f.readline()
+    
+    try:
+        first = loads(first_line)
+    except JSONDecodeError:
+        return False
+    
+    return isinstance(first, dict) and "contents" in first
 
 
 def convert_to_gemini_format(
     input_file: str = "output/vertex_ready.jsonl",
-    output_file: str = "output/gemini_ready.jsonl"
+    output_file: str = "output/gemini_ready.jsonl",
+    workers: int = 1,
+    trusted: bool = False
 ):
     """
     Convert to Gemini conversational format.
@@ -21,6 +187,8 @@ def convert_to_gemini_format(
     Args:
         input_file: Path to vertex_ready.jsonl or structured JSONL
         output_file: Path to output Gemini-ready JSONL file
+        workers: Number of processes converting the file in parallel
+        trusted: Abort on the first bad record instead of skipping it
     """
     input_path = Path(input_file)
     output_path = Path(output_file)
@@ -48,90 +216,32 @@ def convert_to_gemini_format(
     print(f"Output: {output_file}")
     print()
     
-    converted_count = 0
-    skipped_count = 0
-    
-    with open(input_path, "r", encoding="utf-8") as infile, \
-         open(output_path, "w", encoding="utf-8") as outfile:
+    if _is_gemini_file(input_path):
+        # Nothing to convert, let the OS copy the bytes (sendfile where available)
+        print("  Input is already in Gemini format, copying it unchanged")
+        if not (output_path.exists() and output_path.samefile(input_path)):
+            shutil.copyfile(input_path, output_path)
         
-        for line_num, line in enumerate(infile, 1):
-            try:
-                data = json.loads(line)
-                
-                # Check if it's already in vertex format (input_text/output_text)
-                if "input_text" in data and "output_text" in data:
-                    input_text = data["input_text"]
-                    output_text = data["output_text"]
-                else:
-                    # Convert from structured format
-                    required_fields = ['query', 'category', 'title', 'rank', 
-                                       'recency_score', 'user_engagement_score', 
-                                       'relevance_score']
-                    
-                    missing_fields = [f for f in required_fields if f not in data]
-                    if missing_fields:
-                        print(f"  Warning: Line {line_num} missing fields: {missing_fields}")
-                        skipped_count += 1
-                        continue
-                    
-                    # Create the input prompt
-                    input_text = (
-                        f"query: {data['query']}\n"
-                        f"category: {data['category']}\n"
-                        f"title: {data['title']}\n"
-                        f"rank: {data['rank']}\n"
-                        f"recency_score: {data['recency_score']}\n"
-                        f"user_engagement_score: {data['user_engagement_score']}\n\n"
-                        f"Predict a relevance score between 0 and 1."
-                    )
-                    output_text = str(data['relevance_score'])
-                
-                # Create Gemini conversational format
-                gemini_doc = {
-                    "contents": [
-                        {
-                            "role": "user",
-                            "parts": [
-                                {
-                                    "text": input_text
-                                }
-                            ]
-                        },
-                        {
-                            "role": "model",
-                            "parts": [
-                                {
-                                    "text": output_text
-                                }
-                            ]
-                        }
-                    ]
-                }
-                
-                json.dump(gemini_doc, outfile, ensure_ascii=False)
-                outfile.write("\n")
-                
-                converted_count += 1
-                
-                if converted_count % 100 == 0:
-                    print(f"  Converted {converted_count} documents...")
-                
-            except json.JSONDecodeError as e:
-                print(f"  Warning: Line {line_num} is not valid JSON: {e}")
-                skipped_count += 1
-            except Exception as e:
-                print(f"  Warning: Line {line_num} failed: {e}")
-                skipped_count += 1
-    
-    print()
-    print("=" * 60)
-    print("  Conversion Complete!")
-    print("=" * 60)
-    print()
-    print(f"✓ Converted: {converted_count} documents")
-    
-    if skipped_count > 0:
-        print(f"⚠ Skipped: {skipped_count} documents (errors or missing fields)")
+        print(_COMPLETE_BANNER)
+        print("✓ Copied: input was already in Gemini format")
+    else:
+        # Parallel workers report their warnings back instead of printing them
+        worker = partial(_convert_range, verbose=workers <= 1, trusted=trusted)
+        try:
+            results = map_line_ranges(worker, str(input_path), str(output_path), workers)
+        except RecordError as e:
+            # Records before the bad one were already written, drop them
+            remove_output(output_file)
+            print(f"❌ Error: {e}")
+            print("   Run without --trusted to skip invalid records")
+            return False
+        converted_count, skipped_count = merge_range_results(results)
+        
+        print(_COMPLETE_BANNER)
+        print(f"✓ Converted: {converted_count} documents")
+        
+        if skipped_count > 0:
+            print(f"⚠ Skipped: {skipped_count} documents (errors or missing fields)")
     
     print()
     print(f"Output file: {output_file}")
@@ -146,36 +256,11 @@ def convert_to_gemini_format(
     print("Sample of Gemini format:")
     print("-" * 60)
     
-    with open(output_path, "r", encoding="utf-8") as f:
-        sample = json.loads(f.readline())
+    with open(output_path, "rb") as f:
+        sample = loads(f.readline())
         print(json.dumps(sample, indent=2))
     
-    print()
-    print("-" * 60)
-    print()
-    print("✓ Ready to upload to Google Cloud Storage!")
-    print()
-    print("Next steps:")
-    print("  1. Upload to GCS:")
-    print(f"     gsutil cp {output_file} gs://your-bucket/gemini_ready.jsonl")
-    print()
-    print("  2. Fine-tune Gemini:")
-    print("     ```python")
-    print("     import vertexai")
-    print("     from vertexai.tuning import sft")
-    print()
-    print("     vertexai.init(")
-    print('         project="your-project-id",')
-    print('         location="us-central1"')
-    print("     )")
-    print()
-    print("     sft_tuning_job = sft.train(")
-    print('         source_model="gemini-2.0-flash-001",')
-    print(f'         train_dataset="gs://your-bucket/gemini_ready.jsonl",')
-    print('         tuned_model_display_name="ranking-tuned-model"')
-    print("     )")
-    print("     ```")
-    print()
+    print(_NEXT_STEPS.format(output_file=output_file))
     
     return True
 
@@ -197,10 +282,21 @@ def main():
         default="output/gemini_ready.jsonl",
         help="Output Gemini-ready JSONL file (default: output/gemini_ready.jsonl)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to convert with (default: 1)"
+    )
+    parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="Input is known to be clean: stop at the first invalid record instead of skipping it"
+    )
     
     args = parser.parse_args()
     
-    success = convert_to_gemini_format(args.input, args.output)
+    success = convert_to_gemini_format(args.input, args.output, args.workers, args.trusted)
     sys.exit(0 if success else 1)
 
 
@@ -5,14 +5,262 @@ This script converts the structured JSONL format to Vertex AI's expected format:
 - input_text: Combined prompt with all features
 - output_text: The target relevance score
 """
-import json
 import sys
+from functools import partial
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.jsonl_io import (
+    loads, iter_line_blocks, map_line_ranges, count_newlines, JSONLWriter, JSONDecodeError
+)
+
+# Prompt sent to the model for each document. The fields are positional:
+# query, category, title, rank, recency_score, user_engagement_score
+PROMPT_TEMPLATE = (
+    "query: {0}\n"
+    "category: {1}\n"
+    "title: {2}\n"
+    "rank: {3}\n"
+    "recency_score: {4}\n"
+    "user_engagement_score: {5}\n\n"
+    "Predict a relevance score between 0 and 1."
+)
+format_prompt = PROMPT_TEMPLATE.format
+
+# Fields every structured record needs to be converted
+REQUIRED_FIELDS = ('query', 'category', 'title', 'rank',
+                   'recency_score', 'user_engagement_score',
+                   'relevance_score')
+REQUIRED_KEYS = frozenset(REQUIRED_FIELDS)
+
+_COMPLETE_BANNER = """
+============================================================
+  Conversion Complete!
+============================================================
+"""
+
+_NEXT_STEPS = """
+------------------------------------------------------------
+
+✓ Ready to upload to Google Cloud Storage!
+  Next steps:
+  1. Upload to GCS: gsutil cp {output_file} gs://your-bucket/
+  2. Go to Vertex AI Model Garden
+  3. Select your model (Gemini/Text-Bison)
+  4. Click 'Tune model' and point to your GCS file
+"""
+
+
+class RecordError(ValueError):
+    """Raised when a record cannot be converted in trusted mode."""
+
+
+class MissingFieldsError(ValueError):
+    """Raised for a record without all required fields in trusted mode."""
+
+
+def record_error(input_file: str, start: int, line_num: int, error: Exception) -> RecordError:
+    """
+    Build the error that aborts a trusted conversion.
+    
+    Only called once a record has failed, so the lines before the range are
+    counted here rather than tracked while converting.
+    
+    Args:
+        input_file: Path to the input JSONL file
+        start: Offset of the range that was being converted
+        line_num: Line number of the failed record within the range
+        error: Exception raised while converting the record
+        
+    Returns:
+        RecordError whose message names the line number within the file
+    """
+    line_num += count_newlines(input_file, start)
+    if isinstance(error, MissingFieldsError):
+        return RecordError(f"Line {line_num} {error}")
+    if isinstance(error, JSONDecodeError):
+        return RecordError(f"Line {line_num} is not valid JSON: {error}")
+    return RecordError(f"Line {line_num} failed: {error}")
+
+
+def remove_output(*output_files: str):
+    """
+    Delete the output of an aborted conversion so no partial file is left.
+    
+    Args:
+        output_files: Paths of the output files
+    """
+    for output_file in output_files:
+        Path(output_file).unlink(missing_ok=True)
+
+
+def convert_records(
+    input_file: str,
+    start: int,
+    end: int,
+    emit: Callable[[Dict[str, Any]], bool],
+    verbose: bool = True,
+    trusted: bool = False
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """
+    Parse the records in one byte range of the input file and pass each to emit.
+    
+    This is the range worker shared by all of the conversion scripts: it
+    handles parsing, skipping or aborting on bad records, warnings and
+    progress, while emit converts and writes a single record.
+    
+    Args:
+        input_file: Path to the input JSONL file
+        start: Offset of the first byte to convert (must start a line)
+        end: Offset one past the last byte to convert
+        emit: Called with every parsed record; writes it and returns True,
+            or returns False if the record lacks required fields
+        verbose: Print warnings and progress as they happen; when False the
+            warnings are returned to the caller instead
+        trusted: Do not skip records that fail to parse, lack required fields
+            or fail to convert; the first one aborts the conversion with a
+            RecordError instead
+        
+    Returns:
+        Tuple of (converted count, skipped count, warnings) where warnings
+        holds (line number within the range, message) pairs
+        
+    Raises:
+        RecordError: If trusted is set and a record cannot be converted
+    """
+    converted_count = 0
+    skipped_count = 0
+    warnings = []
+    
+    # Every line is either converted or skipped, so a line's number is the
+    # count of lines handled so far plus one
+    def warn(line_num: int, message: str):
+        if verbose:
+            print(f"  Warning: Line {line_num} {message}")
+        else:
+            warnings.append((line_num, message))
+    
+    # Trusted input keeps no per-record handlers (an empty tuple matches no
+    # exception), so a bad record propagates to the single handler below
+    bad_json, bad_record = ((), ()) if trusted else (JSONDecodeError, Exception)
+    
+    with open(input_file, "rb") as infile:
+        infile.seek(start)
+        try:
+            for lines in iter_line_blocks(infile, limit=end - start):
+                for line in lines:
+                    try:
+                        data = loads(line)
+                        
+                        if emit(data):
+                            converted_count += 1
+                            continue
+                        
+                        # Missing fields (the list is only built on failure)
+                        missing_fields = [f for f in REQUIRED_FIELDS if f not in data]
+                        if trusted:
+                            raise MissingFieldsError(f"missing fields: {missing_fields}")
+                        warn(converted_count + skipped_count + 1, f"missing fields: {missing_fields}")
+                        skipped_count += 1
+                        
+                    except bad_json as e:
+                        warn(converted_count + skipped_count + 1, f"is not valid JSON: {e}")
+                        skipped_count += 1
+                    except bad_record as e:
+                        warn(converted_count + skipped_count + 1, f"failed: {e}")
+                        skipped_count += 1
+                
+                # Report progress once per block read rather than per record
+                if verbose:
+                    print(f"  Converted {converted_count} documents...")
+        except Exception as e:
+            if not trusted:
+                raise
+            raise record_error(input_file, start, converted_count + skipped_count + 1, e) from e
+    
+    return converted_count, skipped_count, warnings
+
+
+def _convert_range(
+    input_file: str,
+    output_file: str,
+    start: int,
+    end: int,
+    verbose: bool = True,
+    trusted: bool = False
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """
+    Convert the records in one byte range of the input file.
+    
+    Args:
+        input_file: Path to original JSONL file
+        output_file: Path the converted records are written to
+        start: Offset of the first byte to convert (must start a line)
+        end: Offset one past the last byte to convert
+        verbose: Print warnings and progress as they happen
+        trusted: Abort on the first bad record instead of skipping it
+        
+    Returns:
+        Tuple of (converted count, skipped count, warnings), see convert_records
+    """
+    # The document is filled in place and serialized immediately
+    vertex_doc = {"input_text": "", "output_text": ""}
+    
+    with open(output_file, "wb") as outfile, JSONLWriter(outfile) as writer:
+        
+        def emit(data: Dict[str, Any]) -> bool:
+            # Check for required fields
+            if not data.keys() >= REQUIRED_KEYS:
+                return False
+            
+            # Create the input prompt and the output (target score as string)
+            vertex_doc["input_text"] = format_prompt(
+                data['query'], data['category'], data['title'], data['rank'],
+                data['recency_score'], data['user_engagement_score']
+            )
+            vertex_doc["output_text"] = str(data['relevance_score'])
+            
+            # Write in Vertex AI format
+            writer.write(vertex_doc)
+            return True
+        
+        return convert_records(input_file, start, end, emit, verbose, trusted)
+
+
+def merge_range_results(
+    results: List[Tuple[int, int, List[Tuple[int, str]]]]
+) -> Tuple[int, int]:
+    """
+    Combine the per-range results of a conversion and print their warnings.
+    
+    Warning line numbers are relative to their range, so they are shifted
+    by the number of lines in the preceding ranges (every line is either
+    converted or skipped).
+    
+    Args:
+        results: Values returned by the range worker, in file order
+        
+    Returns:
+        Tuple of (converted count, skipped count) for the whole file
+    """
+    converted_count = 0
+    skipped_count = 0
+    
+    for converted, skipped, warnings in results:
+        line_offset = converted_count + skipped_count
+        for line_num, message in warnings:
+            print(f"  Warning: Line {line_offset + line_num} {message}")
+        converted_count += converted
+        skipped_count += skipped
+    
+    return converted_count, skipped_count
 
 
 def convert_to_vertex_format(
     input_file: str = "output/ranking_training_data.jsonl",
-    output_file: str = "output/vertex_ready.jsonl"
+    output_file: str = "output/vertex_ready.jsonl",
+    workers: int = 1,
+    trusted: bool = False
 ):
     """
     Convert structured JSONL to Vertex AI format.
@@ -20,6 +268,8 @@ def convert_to_vertex_format(
     Args:
         input_file: Path to original JSONL file
         output_file: Path to output Vertex-ready JSONL file
+        workers: Number of processes converting the file in parallel
+        trusted: Abort on the first bad record instead of skipping it
     """
     input_path = Path(input_file)
     output_path = Path(output_file)
@@ -41,67 +291,19 @@ def convert_to_vertex_format(
     print(f"Output: {output_file}")
     print()
     
-    converted_count = 0
-    skipped_count = 0
-    
-    with open(input_path, "r", encoding="utf-8") as infile, \
-         open(output_path, "w", encoding="utf-8") as outfile:
-        
-        for line_num, line in enumerate(infile, 1):
-            try:
-                data = json.loads(line)
-                
-                # Check for required fields
-                required_fields = ['query', 'category', 'title', 'rank', 
-                                   'recency_score', 'user_engagement_score', 
-                                   'relevance_score']
-                
-                missing_fields = [f for f in required_fields if f not in data]
-                if missing_fields:
-                    print(f"  Warning: Line {line_num} missing fields: {missing_fields}")
-                    skipped_count += 1
-                    continue
-                
-                # Create the input prompt
-                prompt = (
-                    f"query: {data['query']}\n"
-                    f"category: {data['category']}\n"
-                    f"title: {data['title']}\n"
-                    f"rank: {data['rank']}\n"
-                    f"recency_score: {data['recency_score']}\n"
-                    f"user_engagement_score: {data['user_engagement_score']}\n\n"
-                    f"Predict a relevance score between 0 and 1."
-                )
-                
-                # Create the output (target score as string)
-                response = str(data['relevance_score'])
-                
-                # Write in Vertex AI format
-                vertex_doc = {
-                    "input_text": prompt,
-                    "output_text": response
-                }
-                
-                json.dump(vertex_doc, outfile, ensure_ascii=False)
-                outfile.write("\n")
-                
-                converted_count += 1
-                
-                if converted_count % 100 == 0:
-                    print(f"  Converted {converted_count} documents...")
-                
-            except json.JSONDecodeError as e:
-                print(f"  Warning: Line {line_num} is not valid JSON: {e}")
-                skipped_count += 1
-            except Exception as e:
-                print(f"  Warning: Line {line_num} failed: {e}")
-                skipped_count += 1
+    # Parallel workers report their warnings back instead of printing them
+    worker = partial(_convert_range, verbose=workers <= 1, trusted=trusted)
+    try:
+        results = map_line_ranges(worker, str(input_path), str(output_path), workers)
+    except RecordError as e:
+        # Records before the bad one were already written, drop them
+        remove_output(output_file)
+        print(f"❌ Error: {e}")
+        print("   Run without --trusted to skip invalid records")
+        return False
+    converted_count, skipped_count = merge_range_results(results)
     
-    print()
-    print("=" * 60)
-    print("  Conversion Complete!")
-    print("=" * 60)
-    print()
+    print(_COMPLETE_BANNER)
     print(f"✓ Converted: {converted_count} documents")
     
     if skipped_count > 0:
@@ -120,21 +322,12 @@ def convert_to_vertex_format(
     print("Sample of converted format:")
     print("-" * 60)
     
-    with open(output_path, "r", encoding="utf-8") as f:
-        sample = json.loads(f.readline())
+    with open(output_path, "rb") as f:
+        sample = loads(f.readline())
         print(f"\ninput_text:\n{sample['input_text']}")
         print(f"\noutput_text: {sample['output_text']}")
     
-    print()
-    print("-" * 60)
-    print()
-    print("✓ Ready to upload to Google Cloud Storage!")
-    print("  Next steps:")
-    print("  1. Upload to GCS: gsutil cp output/vertex_ready.jsonl gs://your-bucket/")
-    print("  2. Go to Vertex AI Model Garden")
-    print("  3. Select your model (Gemini/Text-Bison)")
-    print("  4. Click 'Tune model' and point to your GCS file")
-    print()
+    print(_NEXT_STEPS.format(output_file=output_file))
     
     return True
 
@@ -156,10 +349,21 @@ def main():
         default="output/vertex_ready.jsonl",
         help="Output Vertex-ready JSONL file (default: output/vertex_ready.jsonl)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to convert with (default: 1)"
+    )
+    parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="Input is known to be clean: stop at the first invalid record instead of skipping it"
+    )
     
     args = parser.parse_args()
     
-    success = convert_to_vertex_format(args.input, args.output)
+    success = convert_to_vertex_format(args.input, args.output, args.workers, args.trusted)
     sys.exit(0 if success else 1)
 
 
@@ -6,12 +6,12 @@ This script demonstrates:
 2. How different parameters affect the scores
 3. Sample scoring scenarios
 """
+import io
 import sys
-from datetime import datetime, timedelta
-from pathlib import Path
+from contextlib import redirect_stdout
+from datetime import datetime
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+import numpy as np
 
 from src.scoring import RelevanceScorer
 
@@ -103,12 +103,17 @@ def demo_recency_comparison():
     print(f"{'Days Old':<12} {'Base Score':<15} {'Recency':<15} {'Final Score':<15}")
     print("-" * 70)
     
-    for days_old in [0, 1, 7, 14, 30, 60, 90, 180]:
-        timestamp = (current_date - timedelta(days=days_old)).isoformat()
-        
-        base_score = scorer.calculate_base_rank_score(rank)
-        recency_score = scorer.calculate_recency_score(timestamp, current_date)
-        final_score = scorer.calculate_relevance_score(rank, timestamp, current_date)
+    days_old_values = [0, 1, 7, 14, 30, 60, 90, 180]
+    
+    # Build every timestamp with a single datetime64 subtraction
+    ages = np.array(days_old_values).astype('timedelta64[D]')
+    timestamps = np.datetime64(current_date, 's') - ages
+    scores = scorer.enrich_batch(np.full(len(ages), rank), timestamps, current_date)
+    
+    for i, days_old in enumerate(days_old_values):
+        base_score = scores['base_rank_score'][i]
+        recency_score = scores['recency_score'][i]
+        final_score = scores['relevance_score'][i]
         
         print(f"{days_old:<12} {base_score:<15.6f} {recency_score:<15.6f} {final_score:<15.6f}")
 
@@ -136,8 +141,12 @@ def demo_weight_comparison():
     print(f"{'Configuration':<25} {'Weights (R:T)':<18} {'Final Score':<15}")
     print("-" * 70)
     
-    for base_w, recency_w, label in weight_configs:
-        scorer = RelevanceScorer(base_weight=base_w, recency_weight=recency_w)
+    scorers = [
+        (label, base_w, recency_w, RelevanceScorer(base_weight=base_w, recency_weight=recency_w))
+        for base_w, recency_w, label in weight_configs
+    ]
+    
+    for label, base_w, recency_w, scorer in scorers:
         final_score = scorer.calculate_relevance_score(rank, timestamp, current_date)
         
         print(f"{label:<25} {f'{base_w}:{recency_w}':<18} {final_score:<15.6f}")
@@ -147,9 +156,6 @@ def demo_decay_period():
     """Show how decay period affects recency scoring."""
     print_section("Decay Period Comparison")
     
-    current_date = datetime(2025, 10, 23, 12, 0, 0)
-    rank = 1
-    
     decay_periods = [7, 14, 30, 60, 90]
     days_old_values = [7, 14, 30, 60, 90]
     
@@ -161,13 +167,13 @@ def demo_decay_period():
     print()
     print("-" * 70)
     
+    scorers = [RelevanceScorer(decay_days=period) for period in decay_periods]
+    
     for days_old in days_old_values:
-        timestamp = (current_date - timedelta(days=days_old)).isoformat()
         print(f"{days_old:<12}", end='')
         
-        for decay_period in decay_periods:
-            scorer = RelevanceScorer(decay_days=decay_period)
-            recency_score = scorer.calculate_recency_score(timestamp, current_date)
+        for scorer in scorers:
+            recency_score = scorer.calculate_recency_score_from_age(days_old)
             print(f"{recency_score:<15.6f}", end='')
         print()
 
@@ -196,26 +202,27 @@ def demo_realistic_scenario():
     print("\nTop 10 search results with calculated relevance scores:")
     print("-" * 70)
     
-    # Enrich all documents
-    enriched_results = []
-    for result in search_results:
-        enriched = scorer.enrich_document(result, current_date)
-        enriched_results.append(enriched)
+    # Score all documents in one batch
+    ranks = np.array([r['rank'] for r in search_results])
+    timestamps = np.array([r['timestamp'] for r in search_results], dtype='datetime64[s]')
+    scores = scorer.enrich_batch(ranks, timestamps, current_date)
+    relevance = scores['relevance_score']
     
-    # Sort by relevance score
-    enriched_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+    # Sort by relevance score (stable, highest first)
+    order = np.argsort(-relevance, kind='stable')
     
     print(f"{'Orig Rank':<11} {'New Rank':<11} {'Score':<10} {'Title':<30}")
     print("-" * 70)
     
-    for new_rank, result in enumerate(enriched_results, 1):
-        print(f"{result['rank']:<11} {new_rank:<11} {result['relevance_score']:<10.4f} {result['title'][:28]}")
+    for new_rank, idx in enumerate(order, 1):
+        result = search_results[idx]
+        print(f"{result['rank']:<11} {new_rank:<11} {relevance[idx]:<10.4f} {result['title'][:28]}")
     
     print("\n💡 Notice how recent results move up despite lower original ranks!")
 
 
-def main():
-    """Run all demos."""
+def run_all_demos():
+    """Print every demo section."""
     print("\n" + "🎯" * 35)
     print("  RELEVANCE SCORING MODULE DEMONSTRATION")
     print("🎯" * 35)
@@ -238,6 +245,17 @@ def main():
     print()
 
 
+def main():
+    """Run all demos."""
+    # Collect the report in memory and write it to the terminal in one go
+    report = io.StringIO()
+    try:
+        with redirect_stdout(report):
+            run_all_demos()
+    finally:
+        sys.stdout.write(report.getvalue())
+
+
 if __name__ == "__main__":
     main()
 
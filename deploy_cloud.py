@@ -3,20 +3,23 @@
 Cloud deployment helper script for Elasticsearch JSON Parse Codebase.
 This script helps validate and test your cloud configuration.
 """
+import argparse
 import sys
-import os
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
-
-from config import validate_config, validate_cloud_config, is_cloud_deployment
 
 def main():
     """Main deployment validation function."""
+    parser = argparse.ArgumentParser(
+        description="Validate the Elastic Cloud configuration and test the connection"
+    )
+    parser.parse_args()
+    
     print("🚀 Elasticsearch Cloud Deployment Validator")
     print("=" * 50)
     
+    # Imported here so --help does not pay for loading the config and
+    # Elasticsearch client modules
+    from src.config import validate_config, validate_cloud_config, is_cloud_deployment
+    
     try:
         # Step 1: Basic configuration validation
         print("Step 1: Validating basic configuration...")
@@ -7,7 +7,6 @@ to train a machine learning model for ranking predictions.
 Requirements:
     pip install pandas scikit-learn numpy
 """
-import json
 import sys
 from pathlib import Path
 
@@ -15,7 +14,8 @@ try:
     import pandas as pd
     import numpy as np
     from sklearn.model_selection import train_test_split
-    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+    from sklearn.inspection import permutation_importance
     from sklearn.linear_model import LinearRegression
     from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 except ImportError:
@@ -23,17 +23,25 @@ except ImportError:
     print("Install with: pip install pandas scikit-learn numpy")
     sys.exit(1)
 
+# pyarrow is optional; without it the titles use pandas' own string dtype
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = 'string'
+
 
 def load_jsonl(file_path: str) -> pd.DataFrame:
     """Load JSONL file into a pandas DataFrame."""
     print(f"Loading data from {file_path}...")
     
-    data = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            data.append(json.loads(line))
-    
-    df = pd.DataFrame(data)
+    # pandas parses the JSON lines in C and builds typed columns directly,
+    # without an intermediate list of dicts. Timestamps stay strings,
+    # dtype=False keeps numeric-looking strings (a query like "2024") as
+    # strings and precise_float keeps the scores identical to json.loads().
+    df = pd.read_json(
+        file_path, lines=True, convert_dates=False, dtype=False, precise_float=True
+    )
     print(f"Loaded {len(df)} documents")
     return df
 
@@ -53,13 +61,6 @@ def prepare_features(df: pd.DataFrame) -> tuple:
     # For this example, we'll use simple features
     # In practice, you'd add more: query features, content features, etc.
     
-    # Feature engineering
-    df['rank_inverse'] = 1.0 / df['rank']
-    df['rank_log'] = np.log1p(df['rank'])
-    df['has_description'] = df['description'].notna().astype(int)
-    df['title_length'] = df['title'].str.len()
-    df['category_is_video'] = (df['category'] == 'video').astype(int)
-    
     # Select features
     feature_columns = [
         'rank',
@@ -72,8 +73,28 @@ def prepare_features(df: pd.DataFrame) -> tuple:
         'user_engagement_score'
     ]
     
-    X = df[feature_columns]
-    y = df['relevance_score']
+    # Convert the text columns once so the comparisons and string lengths
+    # below run in vectorized kernels (Arrow-backed strings when available)
+    df['category'] = df['category'].astype('category')
+    df['title'] = df['title'].astype(STRING_DTYPE)
+    
+    # Feature engineering, written straight into a float32 matrix that is
+    # handed to scikit-learn as is
+    rank = df['rank'].to_numpy(dtype=np.float32)
+    
+    X = np.empty((len(df), len(feature_columns)), dtype=np.float32)
+    X[:, 0] = rank
+    X[:, 1] = 1.0 / rank
+    X[:, 2] = np.log1p(rank)
+    X[:, 3] = df['recency_score'].to_numpy(dtype=np.float32)
+    X[:, 4] = df['description'].notna().to_numpy()
+    X[:, 5] = df['title'].str.len().to_numpy(dtype=np.float32, na_value=np.nan)
+    X[:, 6] = (df['category'] == 'video').to_numpy()
+    X[:, 7] = df['user_engagement_score'].to_numpy(dtype=np.float32)
+    
+    # The target is float32 like the features, halving the memory streamed
+    # through fitting and scoring
+    y = df['relevance_score'].to_numpy(dtype=np.float32)
     
     print(f"Features: {feature_columns}")
     print(f"Target: relevance_score")
@@ -81,13 +102,20 @@ def prepare_features(df: pd.DataFrame) -> tuple:
     return X, y, feature_columns
 
 
+# Test rows used to estimate permutation importance for models without
+# built-in feature importances
+PERMUTATION_SAMPLE = 2000
+
+
 def train_models(X_train, X_test, y_train, y_test, feature_names):
     """Train multiple models and compare performance."""
     
     models = {
         'Linear Regression': LinearRegression(),
-        'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
-        'Gradient Boosting': GradientBoostingRegressor(n_estimators=100, random_state=42)
+        # Trees are built on all cores; the histogram-based booster bins the
+        # features once instead of sorting them for every split
+        'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1),
+        'Gradient Boosting': HistGradientBoostingRegressor(max_iter=100, random_state=42)
     }
     
     results = {}
@@ -128,7 +156,21 @@ def train_models(X_train, X_test, y_train, y_test, feature_names):
         # Feature importance (if available)
         if hasattr(model, 'feature_importances_'):
             importances = model.feature_importances_
-            print(f"\n  Top 3 important features:")
+            label = "Top 3 important features"
+        elif isinstance(model, HistGradientBoostingRegressor):
+            # The histogram-based booster has no impurity importances, so one
+            # shuffle of each feature on a slice of the (already shuffled)
+            # test split measures the drop in R² instead
+            importances = permutation_importance(
+                model, X_test[:PERMUTATION_SAMPLE], y_test[:PERMUTATION_SAMPLE],
+                n_repeats=1, random_state=42
+            ).importances_mean
+            label = "Top 3 features by permutation importance (drop in R²)"
+        else:
+            importances = None
+        
+        if importances is not None:
+            print(f"\n  {label}:")
             indices = np.argsort(importances)[::-1][:3]
             for i, idx in enumerate(indices, 1):
                 print(f"    {i}. {feature_names[idx]}: {importances[idx]:.4f}")
@@ -153,24 +195,36 @@ def display_results(results):
     print(f"\n✨ Best model: {best_model_name}")
 
 
-def demonstrate_predictions(model, X_test, y_test, df_test):
-    """Show some example predictions."""
+def demonstrate_predictions(model, X_test, y_test, df, test_indices):
+    """
+    Show some example predictions.
+    
+    Args:
+        model: Trained model
+        X_test: Test feature matrix
+        y_test: Test targets
+        df: Full DataFrame, used to look up the rank and title of each example
+        test_indices: Row labels in df of the test samples, in test order
+    """
     print("\n" + "=" * 70)
     print("Example Predictions")
     print("=" * 70)
     
-    # Make predictions
-    predictions = model.predict(X_test)
+    # Only the examples shown are predicted, walking the trees for the
+    # whole test set would be wasted work
+    num_examples = min(5, len(X_test))
+    predictions = model.predict(X_test[:num_examples])
     
     # Show first 5 examples
     print(f"\n{'Rank':<8} {'Title':<40} {'Actual':<12} {'Predicted':<12} {'Error':<12}")
     print("-" * 90)
     
-    for i in range(min(5, len(X_test))):
-        idx = df_test.index[i]
-        rank = df_test.loc[idx, 'rank']
-        title = df_test.loc[idx, 'title'][:38]
-        actual = y_test.iloc[i]
+    # Only the rows being displayed are looked up in the DataFrame
+    examples = df.loc[test_indices[:num_examples], ['rank', 'title']]
+    
+    for i, (rank, title) in enumerate(examples.itertuples(index=False, name=None)):
+        title = title[:38]
+        actual = y_test[i]
         pred = predictions[i]
         error = abs(actual - pred)
         
@@ -197,10 +251,11 @@ def main():
     # Prepare features
     X, y, feature_names = prepare_features(df)
     
-    # Split data
+    # Split data as plain arrays; the row labels are split alongside so the
+    # examples can be looked up in df later without copying frames
     print("\nSplitting data (80% train, 20% test)...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+    X_train, X_test, y_train, y_test, _, test_indices = train_test_split(
+        X, y, df.index.to_numpy(), test_size=0.2, random_state=42
     )
     print(f"Training samples: {len(X_train)}")
     print(f"Testing samples: {len(X_test)}")
@@ -215,13 +270,7 @@ def main():
     best_model_name = min(results.keys(), key=lambda k: results[k]['test_rmse'])
     best_model = results[best_model_name]['model']
     
-    # Get test data with original DataFrame info
-    test_indices = y_test.index
-    df_test = df.loc[test_indices].reset_index(drop=True)
-    X_test_reset = X_test.reset_index(drop=True)
-    y_test_reset = y_test.reset_index(drop=True)
-    
-    demonstrate_predictions(best_model, X_test_reset, y_test_reset, df_test)
+    demonstrate_predictions(best_model, X_test, y_test, df, test_indices)
     
     print("\n" + "=" * 70)
     print("  Training Complete!")
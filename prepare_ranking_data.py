@@ -7,18 +7,83 @@ This script:
 3. Updates documents in Elasticsearch with the computed scores
 4. Exports all processed documents to a JSONL file for Vertex AI fine-tuning
 """
-import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from itertools import chain, repeat
+from typing import List, Dict, Any, Iterable, Optional
 from pathlib import Path
 
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+from elasticsearch.helpers import parallel_bulk, scan
 
-from src.elasticsearch_client.es_client import ElasticsearchClient
-from src.scoring import RelevanceScorer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# tqdm is optional; without it the long loops run without a progress bar
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+from src.elasticsearch_client.es_client import BULK_MODE_MIN_DOCS, ElasticsearchClient
+from src.scoring import RelevanceScorer, round_scores
 from src.config import ELASTIC_INDEX
+from src.jsonl_io import JSONLWriter
+
+# Documents scored per worker process; smaller batches are scored in-process
+# since starting the workers would cost more than it saves
+SCORING_CHUNK_SIZE = 50_000
+
+
+def score_columns(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Gather the fields used for scoring into one column per field.
+    
+    Ranks become a contiguous float64 array (the dtype the scorer divides
+    in, so fractional ranks are not truncated) that NumPy and pickle, for
+    the worker processes, handle without touching a Python object per row.
+    Timestamps stay in a list since they are parsed while scoring.
+    
+    Args:
+        documents: List of documents from Elasticsearch
+        
+    Returns:
+        Dictionary with 'rank' (ndarray) and 'timestamp' (list) columns
+    """
+    if np is None:
+        raise ImportError("batch scoring requires numpy (pip install numpy)")
+    
+    return {
+        'rank': np.fromiter(
+            (doc.get('rank', 1) for doc in documents),
+            dtype=np.float64,
+            count=len(documents)
+        ),
+        'timestamp': [doc.get('timestamp') for doc in documents]
+    }
+
+
+def _progress(iterable: Iterable, desc: str, total: Optional[int] = None) -> Iterable:
+    """
+    Wrap an iterable in a progress bar if tqdm is installed.
+    
+    The bar redraws at most twice a second, so it costs far less than
+    printing a line every few documents.
+    
+    Args:
+        iterable: Items being processed
+        desc: Label shown in front of the bar
+        total: Number of items, when the iterable has no len()
+        
+    Returns:
+        The iterable itself, or a tqdm wrapper around it
+    """
+    if tqdm is None:
+        return iterable
+    return tqdm(iterable, desc=desc, total=total, mininterval=0.5, unit="doc")
 
 
 class RankingDataPreparation:
@@ -30,7 +95,10 @@ class RankingDataPreparation:
         vertex_format: bool = False,
         base_weight: float = 0.6,
         recency_weight: float = 0.4,
-        decay_days: int = 30
+        decay_days: int = 30,
+        workers: Optional[int] = None,
+        fetch_slices: int = 4,
+        parquet_file: Optional[str] = None
     ):
         """
         Initialize the data preparation pipeline.
@@ -41,6 +109,11 @@ class RankingDataPreparation:
             base_weight: Weight for base rank score
             recency_weight: Weight for recency score
             decay_days: Number of days for recency decay
+            workers: Processes used to score large batches (defaults to the
+                number of CPUs)
+            fetch_slices: Number of scroll slices fetched concurrently
+            parquet_file: Also export the scores to this Parquet file, with
+                float32 score columns (requires pyarrow)
         """
         self.es_client = ElasticsearchClient()
         self.scorer = RelevanceScorer(
@@ -55,11 +128,20 @@ class RankingDataPreparation:
         
         self.output_file = output_file
         self.vertex_format = vertex_format
+        self.workers = workers or os.cpu_count() or 1
+        self.fetch_slices = max(1, fetch_slices)
+        self.parquet_file = parquet_file
+        if parquet_file:
+            Path(parquet_file).parent.mkdir(parents=True, exist_ok=True)
         self.current_date = datetime.now()
     
     def fetch_all_documents(self) -> List[Dict[str, Any]]:
         """
-        Fetch all documents from Elasticsearch using scroll API.
+        Fetch all documents from Elasticsearch using the scan helper.
+        
+        With more than one slice the index is split into sliced scrolls that
+        are read by concurrent threads, so waiting on one page overlaps with
+        fetching the others (the client releases the GIL during socket I/O).
         
         Returns:
             List of all documents from the index
@@ -67,41 +149,12 @@ class RankingDataPreparation:
         print(f"Fetching documents from index: {ELASTIC_INDEX}")
         
         try:
-            # Initialize scroll
-            page_size = 100
-            response = self.es_client.es.search(
-                index=ELASTIC_INDEX,
-                scroll='2m',
-                size=page_size,
-                body={"query": {"match_all": {}}}
-            )
-            
-            scroll_id = response['_scroll_id']
-            documents = []
-            
-            # Get first batch
-            hits = response['hits']['hits']
-            for hit in hits:
-                doc = hit['_source']
-                doc['_id'] = hit['_id']  # Preserve document ID
-                documents.append(doc)
-            
-            # Continue scrolling until no more results
-            while len(hits) > 0:
-                response = self.es_client.es.scroll(
-                    scroll_id=scroll_id,
-                    scroll='2m'
-                )
-                scroll_id = response['_scroll_id']
-                hits = response['hits']['hits']
-                
-                for hit in hits:
-                    doc = hit['_source']
-                    doc['_id'] = hit['_id']
-                    documents.append(doc)
-            
-            # Clear scroll context
-            self.es_client.es.clear_scroll(scroll_id=scroll_id)
+            if self.fetch_slices == 1:
+                documents = self._fetch_slice(None)
+            else:
+                with ThreadPoolExecutor(max_workers=self.fetch_slices) as pool:
+                    slices = pool.map(self._fetch_slice, range(self.fetch_slices))
+                    documents = [doc for part in slices for doc in part]
             
             print(f"Fetched {len(documents)} documents")
             return documents
@@ -110,6 +163,43 @@ class RankingDataPreparation:
             print(f"Error fetching documents: {e}")
             return []
     
+    def _fetch_slice(self, slice_id: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Read one slice of the index (or all of it) with the scan helper.
+        
+        Args:
+            slice_id: Slice to read out of self.fetch_slices, or None for the
+                whole index
+            
+        Returns:
+            Documents in the slice
+        """
+        query = {"query": {"match_all": {}}}
+        if slice_id is not None:
+            query["slice"] = {"id": slice_id, "max": self.fetch_slices}
+        
+        # scan() scrolls in unsorted _doc order (no scoring on the shards)
+        # and clears the scroll context when done; large pages keep the
+        # number of round trips low
+        hits = scan(
+            self.es_client.es,
+            index=ELASTIC_INDEX,
+            query=query,
+            scroll='2m',
+            size=5000,
+            preserve_order=False
+        )
+        
+        documents = []
+        for hit in hits:
+            doc = hit['_source']
+            doc['_id'] = hit['_id']  # Preserve document ID
+            if '_routing' in hit:
+                doc['_routing'] = hit['_routing']  # Needed to update routed documents
+            documents.append(doc)
+        
+        return documents
+    
     def process_documents(
         self, 
         documents: List[Dict[str, Any]]
@@ -117,6 +207,10 @@ class RankingDataPreparation:
         """
         Process documents by computing relevance scores.
         
+        All documents are scored at once with NumPy; if that fails (or NumPy
+        is not installed) they are scored one at a time so the documents
+        that cannot be scored are reported and skipped.
+        
         Args:
             documents: List of documents from Elasticsearch
             
@@ -125,17 +219,87 @@ class RankingDataPreparation:
         """
         print(f"Processing {len(documents)} documents...")
         
+        try:
+            enriched_docs = self._enrich_batch(documents)
+        except Exception as e:
+            print(f"  Batch scoring unavailable ({e}), scoring documents one at a time")
+            enriched_docs = self._enrich_each(documents)
+        
+        print(f"Successfully processed {len(enriched_docs)} documents")
+        return enriched_docs
+    
+    def _enrich_batch(
+        self, 
+        documents: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Score all documents with vectorized calls.
+        
+        Large batches are split into chunks that are scored in parallel
+        worker processes.
+        
+        Args:
+            documents: List of documents from Elasticsearch
+            
+        Returns:
+            List of enriched documents, same values as enrich_document()
+        """
+        columns = score_columns(documents)
+        ranks = columns['rank']
+        timestamps = columns['timestamp']
+        
+        if self.workers > 1 and len(documents) > SCORING_CHUNK_SIZE:
+            # Only the rank and timestamp columns and the score arrays cross
+            # process boundaries, the documents themselves stay here
+            starts = range(0, len(documents), SCORING_CHUNK_SIZE)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(starts))) as pool:
+                parts = list(pool.map(
+                    self.scorer.enrich_batch,
+                    [ranks[i:i + SCORING_CHUNK_SIZE] for i in starts],
+                    [timestamps[i:i + SCORING_CHUNK_SIZE] for i in starts],
+                    repeat(self.current_date)
+                ))
+        else:
+            parts = [self.scorer.enrich_batch(ranks, timestamps, self.current_date)]
+        
+        engagement = self.scorer.default_engagement
+        enriched_docs = []
+        
+        for doc, base_rank_score, recency_score, relevance_score in zip(
+            documents,
+            chain.from_iterable(round_scores(part['base_rank_score']) for part in parts),
+            chain.from_iterable(round_scores(part['recency_score']) for part in parts),
+            chain.from_iterable(round_scores(part['relevance_score']) for part in parts)
+        ):
+            enriched_doc = doc.copy()
+            enriched_doc['base_rank_score'] = base_rank_score
+            enriched_doc['recency_score'] = recency_score
+            enriched_doc['relevance_score'] = relevance_score
+            enriched_doc['user_engagement_score'] = engagement
+            enriched_docs.append(enriched_doc)
+        
+        return enriched_docs
+    
+    def _enrich_each(
+        self, 
+        documents: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Score documents one at a time, skipping the ones that fail.
+        
+        Args:
+            documents: List of documents from Elasticsearch
+            
+        Returns:
+            List of the documents that could be enriched
+        """
         enriched_docs = []
         failed_count = 0
         
-        for i, doc in enumerate(documents):
+        for doc in _progress(documents, "  Scoring"):
             try:
                 enriched_doc = self.scorer.enrich_document(doc, self.current_date)
                 enriched_docs.append(enriched_doc)
-                
-                if (i + 1) % 100 == 0:
-                    print(f"  Processed {i + 1}/{len(documents)} documents")
-                    
             except Exception as e:
                 print(f"  Warning: Failed to process document {doc.get('_id', 'unknown')}: {e}")
                 failed_count += 1
@@ -143,7 +307,6 @@ class RankingDataPreparation:
         if failed_count > 0:
             print(f"Warning: {failed_count} documents failed to process")
         
-        print(f"Successfully processed {len(enriched_docs)} documents")
         return enriched_docs
     
     def update_elasticsearch(
@@ -161,19 +324,24 @@ class RankingDataPreparation:
         """
         print(f"Updating {len(documents)} documents in Elasticsearch...")
         
-        success_count = 0
-        failed_count = 0
+        missing_ids = 0
         
-        for i, doc in enumerate(documents):
-            try:
+        def update_actions():
+            # Generated lazily so the bulk helper never holds more than one
+            # chunk of actions
+            nonlocal missing_ids
+            for doc in documents:
                 doc_id = doc.get('_id')
                 if not doc_id:
                     print(f"  Warning: Document missing _id, skipping")
-                    failed_count += 1
+                    missing_ids += 1
                     continue
                 
-                # Prepare update body (only the scores we want to add)
-                update_body = {
+                # Only the scores we want to add
+                action = {
+                    "_op_type": "update",
+                    "_index": ELASTIC_INDEX,
+                    "_id": doc_id,
                     "doc": {
                         "base_rank_score": doc['base_rank_score'],
                         "recency_score": doc['recency_score'],
@@ -182,22 +350,48 @@ class RankingDataPreparation:
                     }
                 }
                 
-                # Update the document
-                self.es_client.es.update(
-                    index=ELASTIC_INDEX,
-                    id=doc_id,
-                    body=update_body
-                )
+                # Documents indexed with a routing value are only found with it
+                routing = doc.get('_routing')
+                if routing is not None:
+                    action["_routing"] = routing
                 
-                success_count += 1
+                yield action
+        
+        success_count = 0
+        error_count = 0
+        
+        # Large updates run with index refreshes switched off
+        bulk_mode = (
+            len(documents) >= BULK_MODE_MIN_DOCS and self.es_client.set_bulk_mode(True)
+        )
+        
+        try:
+            # Chunks of 1000 updates are sent from a pool of threads, so
+            # serializing one chunk overlaps with the network I/O of others
+            results = parallel_bulk(
+                self.es_client.es.options(request_timeout=60),
+                update_actions(),
+                thread_count=8,
+                chunk_size=1000,
+                queue_size=16,
+                raise_on_error=False
+            )
+            for ok, item in _progress(results, "  Updating", total=len(documents)):
+                if ok:
+                    success_count += 1
+                    continue
                 
-                if (i + 1) % 100 == 0:
-                    print(f"  Updated {i + 1}/{len(documents)} documents")
-                    
-            except Exception as e:
-                print(f"  Warning: Failed to update document {doc.get('_id', 'unknown')}: {e}")
-                failed_count += 1
+                result = item.get('update', {})
+                print(f"  Warning: Failed to update document {result.get('_id', 'unknown')}: {result.get('error')}")
+                error_count += 1
+        except Exception as e:
+            print(f"  Error: Bulk update failed: {e}")
+            return success_count
+        finally:
+            if bulk_mode:
+                self.es_client.set_bulk_mode(False)
         
+        failed_count = error_count + missing_ids
         if failed_count > 0:
             print(f"Warning: {failed_count} documents failed to update")
         
@@ -223,29 +417,40 @@ class RankingDataPreparation:
             print(f"Saving {len(documents)} documents to {self.output_file}...")
         
         try:
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                for doc in documents:
+            # Records are encoded straight to UTF-8 bytes (orjson when
+            # installed) and written out in large batches
+            with open(self.output_file, 'wb') as f:
+                with JSONLWriter(f) as writer:
                     if self.vertex_format:
-                        # Convert to Vertex AI format
-                        prompt = (
-                            f"query: {doc.get('query', 'N/A')}\n"
-                            f"category: {doc.get('category', 'N/A')}\n"
-                            f"title: {doc.get('title', 'N/A')}\n"
-                            f"rank: {doc.get('rank', 'N/A')}\n"
-                            f"recency_score: {doc.get('recency_score', 'N/A')}\n"
-                            f"user_engagement_score: {doc.get('user_engagement_score', 'N/A')}\n\n"
-                            f"Predict a relevance score between 0 and 1."
-                        )
-                        
-                        vertex_doc = {
-                            "input_text": prompt,
-                            "output_text": str(doc.get('relevance_score', '0.0'))
-                        }
-                        f.write(json.dumps(vertex_doc, ensure_ascii=False) + '\n')
+                        for doc in documents:
+                            # Convert to Vertex AI format
+                            prompt = (
+                                f"query: {doc.get('query', 'N/A')}\n"
+                                f"category: {doc.get('category', 'N/A')}\n"
+                                f"title: {doc.get('title', 'N/A')}\n"
+                                f"rank: {doc.get('rank', 'N/A')}\n"
+                                f"recency_score: {doc.get('recency_score', 'N/A')}\n"
+                                f"user_engagement_score: {doc.get('user_engagement_score', 'N/A')}\n\n"
+                                f"Predict a relevance score between 0 and 1."
+                            )
+                            
+                            vertex_doc = {
+                                "input_text": prompt,
+                                "output_text": str(doc.get('relevance_score', '0.0'))
+                            }
+                            writer.write(vertex_doc)
                     else:
-                        # Original structured format
-                        doc_to_save = {k: v for k, v in doc.items() if k != '_id'}
-                        f.write(json.dumps(doc_to_save, ensure_ascii=False) + '\n')
+                        for doc in documents:
+                            # Original structured format
+                            doc_to_save = doc.copy()
+                            doc_to_save.pop('_id', None)
+                            doc_to_save.pop('_routing', None)
+                            writer.write(doc_to_save)
+                
+                # Everything has been handed to the OS, so the open handle
+                # reports the final size without another path lookup
+                f.flush()
+                file_size = os.fstat(f.fileno()).st_size
             
             if self.vertex_format:
                 print(f"Successfully saved data to {self.output_file} (Vertex AI format)")
@@ -253,7 +458,6 @@ class RankingDataPreparation:
                 print(f"Successfully saved data to {self.output_file}")
             
             # Print file size
-            file_size = Path(self.output_file).stat().st_size
             print(f"File size: {file_size / 1024:.2f} KB")
             
             return True
@@ -262,6 +466,33 @@ class RankingDataPreparation:
             print(f"Error saving to JSONL: {e}")
             return False
     
+    def save_to_parquet(
+        self, 
+        documents: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Save the scores of processed documents to a Parquet file.
+        
+        Args:
+            documents: List of enriched documents
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        print(f"Saving {len(documents)} documents to {self.parquet_file} (Parquet)...")
+        
+        try:
+            self.scorer.to_parquet(self.parquet_file, documents)
+            file_size = os.path.getsize(self.parquet_file)
+            
+            print(f"Successfully saved data to {self.parquet_file} (Parquet)")
+            print(f"File size: {file_size / 1024:.2f} KB")
+            return True
+            
+        except Exception as e:
+            print(f"Error saving to Parquet: {e}")
+            return False
+    
     def run(self) -> bool:
         """
         Run the complete data preparation pipeline.
@@ -310,6 +541,13 @@ class RankingDataPreparation:
             print("Error: Failed to save JSONL file")
             return False
         
+        # Step 5: Optionally export the scores for training as Parquet
+        if self.parquet_file:
+            print()
+            if not self.save_to_parquet(enriched_docs):
+                print("Error: Failed to save Parquet file")
+                return False
+        
         print()
         print("=" * 60)
         print("Data Preparation Pipeline Completed Successfully!")
@@ -320,6 +558,8 @@ class RankingDataPreparation:
         print(f"  - Documents processed: {len(enriched_docs)}")
         print(f"  - Documents updated in ES: {updated_count}")
         print(f"  - Output file: {self.output_file}")
+        if self.parquet_file:
+            print(f"  - Parquet file: {self.parquet_file}")
         print()
         
         # Print sample scores
@@ -2,43 +2,97 @@
 Configuration module for loading environment variables and constants.
 """
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
 
-# Load environment variables from .env file
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+# .env file in the project root, resolved once
+_ENV_PATH = Path(__file__).resolve().parent.parent / '.env'
 
-# SerpAPI configuration
-SERPAPI_KEY = os.getenv('SERPAPI_KEY')
-
-# Elasticsearch configuration
-ELASTIC_URL = os.getenv('ELASTIC_URL', 'http://localhost:9200')
-ELASTIC_API_KEY = os.getenv('ELASTIC_API_KEY')
+# Elasticsearch index that holds the search results
 ELASTIC_INDEX = 'search_results'
 
 # Search configuration
 RESULTS_PER_PAGE = 10
 MAX_PAGES = 5
 
+# Host fragments that identify an Elastic Cloud endpoint
+_CLOUD_HOST_MARKERS = ('elastic-cloud', 'aws.found.io', 'gcp.found.io', 'azure.found.io', 'es.')
+
+
+@dataclass(frozen=True)
+class Config:
+    """Settings read from the environment (and the .env file)."""
+    serpapi_key: Optional[str]
+    elastic_url: str
+    elastic_api_key: Optional[str]
+    cloud_deployment: bool
+
+
+def _load_env_file():
+    """
+    Load environment variables from the .env file.
+    
+    Child processes inherit the loaded variables, so the file is parsed
+    once per process tree, and python-dotenv is only imported when there
+    is a file to read.
+    """
+    if os.environ.get('_QUERY_DOTENV_LOADED') != str(_ENV_PATH):
+        if _ENV_PATH.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=_ENV_PATH)
+        os.environ['_QUERY_DOTENV_LOADED'] = str(_ENV_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """
+    Read the configuration on first use and return the same object after.
+    
+    Returns:
+        Frozen Config with the SerpAPI and Elasticsearch settings
+    """
+    _load_env_file()
+    
+    serpapi_key = os.getenv('SERPAPI_KEY')
+    elastic_url = os.getenv('ELASTIC_URL', 'http://localhost:9200')
+    elastic_api_key = os.getenv('ELASTIC_API_KEY')
+    
+    # Cloud deployments are detected from the API key and endpoint host
+    cloud_deployment = bool(
+        elastic_api_key and any(marker in elastic_url for marker in _CLOUD_HOST_MARKERS)
+    )
+    
+    return Config(
+        serpapi_key=serpapi_key,
+        elastic_url=elastic_url,
+        elastic_api_key=elastic_api_key,
+        cloud_deployment=cloud_deployment
+    )
+
+
 # Deployment mode detection
 def is_cloud_deployment():
     """Check if this is a cloud deployment based on environment variables."""
-    return bool(ELASTIC_API_KEY and ('elastic-cloud' in ELASTIC_URL or 'aws.found.io' in ELASTIC_URL or 'gcp.found.io' in ELASTIC_URL or 'azure.found.io' in ELASTIC_URL or 'es.' in ELASTIC_URL))
+    return get_config().cloud_deployment
 
 # Validate required environment variables
 def validate_config():
     """Validate that required environment variables are set."""
+    config = get_config()
     missing_vars = []
 
-    if not SERPAPI_KEY:
+    if not config.serpapi_key:
         missing_vars.append('SERPAPI_KEY')
 
     # For cloud deployment, we need API key
-    if is_cloud_deployment():
-        if not ELASTIC_API_KEY:
+    if config.cloud_deployment:
+        if not config.elastic_api_key:
             missing_vars.append('ELASTIC_API_KEY')
     else:
         # For local deployment, ELASTIC_URL is sufficient
-        if not ELASTIC_URL or ELASTIC_URL == 'http://localhost:9200':
+        if not config.elastic_url or config.elastic_url == 'http://localhost:9200':
             print("Warning: Using default local Elasticsearch URL. For cloud deployment, set ELASTIC_URL to your cloud endpoint.")
 
     if missing_vars:
@@ -56,7 +110,7 @@ def validate_cloud_config():
     
     # Test Elasticsearch connection
     try:
-        from elasticsearch_client.es_client import ElasticsearchClient
+        from .elasticsearch_client.es_client import ElasticsearchClient
         client = ElasticsearchClient()
         
         if client.test_connection():
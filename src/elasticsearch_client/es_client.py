@@ -1,37 +1,144 @@
 """
 Elasticsearch client for indexing search results.
 """
-from typing import List, Dict, Any
+import os
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
-from config import ELASTIC_URL, ELASTIC_INDEX, ELASTIC_API_KEY, is_cloud_deployment
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.helpers import parallel_bulk
+from elasticsearch.serializer import JSONSerializer
+from ..config import ELASTIC_INDEX, get_config
+from ..ttl_cache import TTLCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonSerializer(JSONSerializer):
+    """JSON serializer for the Elasticsearch client backed by orjson."""
+    
+    def dumps(self, data: Any) -> bytes:
+        # Bodies that are already encoded are sent as they are
+        if isinstance(data, str):
+            return data.encode("utf-8", "surrogatepass")
+        if isinstance(data, bytes):
+            return data
+        
+        try:
+            return orjson.dumps(data, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError as e:
+            raise SerializationError(f"Unable to serialize to JSON: {data!r}", errors=(e,))
+    
+    def loads(self, data: bytes) -> Any:
+        # Some responses are typed as JSON but have an empty body
+        if data == b"":
+            return None
+        
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise SerializationError(f"Unable to deserialize as JSON: {data!r}", errors=(e,))
+
+
+# Serializer for request and response bodies (None keeps the client's default)
+JSON_SERIALIZER = OrjsonSerializer() if orjson is not None else None
+
+# Pooled HTTP connections per Elasticsearch node, enough for every bulk
+# thread to hold its own (never below the client's default of 10)
+CONNECTIONS_PER_NODE = max(10, 2 * (os.cpu_count() or 1))
+
+# Refresh interval of locally created indices; new documents become
+# searchable within this time
+REFRESH_INTERVAL = "30s"
+
+# Loads of at least this many documents switch refreshes off while running
+BULK_MODE_MIN_DOCS = 10_000
 
 
 class ElasticsearchClient:
-    """Client for interacting with Elasticsearch."""
+    """
+    Client for interacting with Elasticsearch.
     
-    def __init__(self):
+    Documents are routed by their query, so all results of one query live on
+    the same shard and a bulk request for a query goes to a single shard
+    instead of fanning out to all of them. The tradeoff is that shard sizes
+    follow the number of results per query rather than being balanced by id.
+    
+    Documents indexed before routing was added were placed by their _id. On
+    an index with more than one shard, re-indexing them with routing can
+    place the new copy on a different shard, leaving the old one as a
+    duplicate. Such indices should be rebuilt (or the old documents removed
+    with a delete-by-query for their query) before re-indexing.
+    """
+    
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        thread_count: Optional[int] = None,
+        max_chunk_bytes: int = 50 * 1024 * 1024,
+        queue_size: int = 4,
+        search_cache_size: int = 1024,
+        search_cache_ttl: float = 60.0
+    ):
+        """
+        Initialize the client.
+        
+        Args:
+            chunk_size: Documents per bulk request when indexing
+            thread_count: Threads sending bulk requests in parallel
+                (defaults to the number of CPUs, at most 8)
+            max_chunk_bytes: Upper bound on the size of one bulk request
+            queue_size: Chunks queued ahead of the sending threads
+            search_cache_size: Searches whose results are kept for reuse
+            search_cache_ttl: Seconds a cached search result stays valid
+        """
         self.es = self._create_elasticsearch_client()
         self.index_name = ELASTIC_INDEX
+        self.chunk_size = chunk_size
+        self.thread_count = thread_count or min(os.cpu_count() or 1, 8)
+        self.max_chunk_bytes = max_chunk_bytes
+        self.queue_size = queue_size
+        
+        # Set once the index is known to exist
+        self._index_ready = False
+        
+        # Results of recent searches, keyed by (query, category, size) and
+        # dropped whenever new documents are indexed
+        self._search_cache = TTLCache(maxsize=search_cache_size, ttl=search_cache_ttl)
     
     def _create_elasticsearch_client(self) -> Elasticsearch:
-        """Create Elasticsearch client with appropriate authentication."""
-        if is_cloud_deployment():
+        """
+        Create Elasticsearch client with appropriate authentication.
+        
+        Request bodies are gzip-compressed, which keeps large bulk requests
+        small on the wire at the cost of some client CPU.
+        """
+        config = get_config()
+        if config.cloud_deployment:
             # Cloud deployment with API key authentication
             return Elasticsearch(
-                [ELASTIC_URL],
-                api_key=ELASTIC_API_KEY,
+                [config.elastic_url],
+                api_key=config.elastic_api_key,
                 request_timeout=30,
                 retry_on_timeout=True,
-                max_retries=3
+                max_retries=3,
+                serializer=JSON_SERIALIZER,
+                http_compress=True,
+                connections_per_node=CONNECTIONS_PER_NODE
             )
         else:
             # Local deployment
             return Elasticsearch(
-                [ELASTIC_URL],
+                [config.elastic_url],
                 request_timeout=30,
                 retry_on_timeout=True,
-                max_retries=3
+                max_retries=3,
+                serializer=JSON_SERIALIZER,
+                http_compress=True,
+                connections_per_node=CONNECTIONS_PER_NODE
             )
     
     def test_connection(self) -> bool:
@@ -51,9 +158,15 @@ class ElasticsearchClient:
         """
         Create the search_results index if it doesn't exist.
         
+        The index is only checked once per client; later calls return right
+        away once it is known to exist.
+        
         Returns:
             True if index exists or was created successfully
         """
+        if self._index_ready:
+            return True
+        
         try:
             if not self.es.indices.exists(index=self.index_name):
                 # Define mapping for search results
@@ -79,10 +192,12 @@ class ElasticsearchClient:
                 }
                 
                 # Add settings only for local deployment (serverless handles this automatically)
-                if not is_cloud_deployment():
+                if not get_config().cloud_deployment:
                     mapping["settings"] = {
                         "number_of_shards": 1,
-                        "number_of_replicas": 0
+                        "number_of_replicas": 0,
+                        "refresh_interval": REFRESH_INTERVAL,
+                        "translog": {"flush_threshold_size": "1gb"}
                     }
                 
                 self.es.indices.create(index=self.index_name, body=mapping)
@@ -90,18 +205,100 @@ class ElasticsearchClient:
             else:
                 print(f"Elasticsearch index already exists: {self.index_name}")
             
+            self._index_ready = True
             return True
             
         except Exception as e:
             print(f"Error creating index: {e}")
             return False
     
-    def index_to_elastic(self, json_docs: List[Dict[str, Any]]) -> bool:
+    def set_bulk_mode(self, enable: bool) -> bool:
+        """
+        Switch index refreshes off for a large load, or back on after it.
+        
+        Without refreshes Elasticsearch does not write out new segments while
+        the documents arrive. Turning bulk mode off restores the normal
+        refresh interval and refreshes once, so everything loaded becomes
+        searchable right away. Serverless deployments manage refreshes
+        themselves and are left alone.
+        
+        Args:
+            enable: True before the load, False after it
+            
+        Returns:
+            True if the index settings were changed
+        """
+        if get_config().cloud_deployment:
+            return False
+        
+        try:
+            interval = "-1" if enable else REFRESH_INTERVAL
+            self.es.indices.put_settings(
+                index=self.index_name,
+                settings={"index": {"refresh_interval": interval}}
+            )
+            if not enable:
+                self.es.indices.refresh(index=self.index_name)
+            return True
+            
+        except Exception as e:
+            print(f"Warning: Could not change the refresh interval: {e}")
+            return False
+    
+    def _actions(
+        self,
+        json_docs: List[Dict[str, Any]],
+        query: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the bulk index action for each document.
+        
+        Generated lazily so only the chunk being sent is held in memory.
+        
+        Args:
+            json_docs: List of structured JSON documents
+            query: Query shared by every document, when all documents
+                belong to the same query; it is used for their ids and routing
+            
+        Yields:
+            Bulk actions indexing each document
+        """
+        index_name = self.index_name
+        
+        if query is not None:
+            # Same ids and routing as below, without reading every document's query
+            query_prefix = f"{query}_"
+            for i, doc in enumerate(json_docs):
+                yield {
+                    "_index": index_name,
+                    "_id": f"{query_prefix}{doc['category']}_{doc['rank']}_{i}",
+                    "_routing": query,
+                    "_source": doc
+                }
+            return
+        
+        for i, doc in enumerate(json_docs):
+            query = doc['query']
+            yield {
+                "_index": index_name,
+                "_id": f"{query}_{doc['category']}_{doc['rank']}_{i}",
+                "_routing": query,
+                "_source": doc
+            }
+    
+    def index_to_elastic(
+        self,
+        json_docs: List[Dict[str, Any]],
+        query: Optional[str] = None
+    ) -> bool:
         """
         Bulk insert JSON documents into Elasticsearch.
         
         Args:
             json_docs: List of structured JSON documents
+            query: The query of every document, when they all have the same
+                one, which saves reading it from each document for its id
+                and routing
             
         Returns:
             True if indexing successful, False otherwise
@@ -111,24 +308,37 @@ class ElasticsearchClient:
                 print("No documents to index")
                 return True
             
-            # Prepare documents for bulk indexing
-            actions = []
-            for i, doc in enumerate(json_docs):
-                action = {
-                    "_index": self.index_name,
-                    "_id": f"{doc['query']}_{doc['category']}_{doc['rank']}_{i}",
-                    "_source": doc
-                }
-                actions.append(action)
-            
-            # Perform bulk indexing
-            success_count, failed_items = bulk(self.es, actions)
+            # Perform bulk indexing, with the chunks sent from several threads
+            success_count = 0
+            failed_items = []
+            bulk_mode = len(json_docs) >= BULK_MODE_MIN_DOCS and self.set_bulk_mode(True)
+            try:
+                for ok, item in parallel_bulk(
+                    self.es,
+                    self._actions(json_docs, query),
+                    thread_count=self.thread_count,
+                    chunk_size=self.chunk_size,
+                    max_chunk_bytes=self.max_chunk_bytes,
+                    queue_size=self.queue_size,
+                    raise_on_error=False
+                ):
+                    if ok:
+                        success_count += 1
+                    else:
+                        failed_items.append(item)
+            finally:
+                if bulk_mode:
+                    self.set_bulk_mode(False)
             
             if failed_items:
                 print(f"Warning: {len(failed_items)} documents failed to index")
                 for item in failed_items:
                     print(f"Failed item: {item}")
             
+            # Cached searches may no longer match the index
+            if success_count:
+                self._search_cache.clear()
+            
             print(f"Successfully indexed {success_count} documents to Elasticsearch")
             return True
             
@@ -140,6 +350,9 @@ class ElasticsearchClient:
         """
         Search for documents in Elasticsearch.
         
+        Results are cached for a short time, so repeating a search right away
+        does not query Elasticsearch again.
+        
         Args:
             query: Search query
             category: Optional category filter
@@ -148,43 +361,115 @@ class ElasticsearchClient:
         Returns:
             List of search results
         """
-        try:
-            search_body = {
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"match": {"query": query}}
-                        ]
-                    }
-                },
-                "size": size,
-                "sort": [{"rank": {"order": "asc"}}]
-            }
-            
-            if category:
-                search_body["query"]["bool"]["filter"] = [
-                    {"term": {"category": category}}
-                ]
-            
-            response = self.es.search(index=self.index_name, body=search_body)
+        return self.search_documents_batch([(query, category, size)])[0]
+    
+    def search_documents_batch(
+        self,
+        searches: Sequence[Tuple[str, Optional[str], int]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches in one multi-search request.
+        
+        Searches with a cached result are answered from the cache and the rest
+        are sent to Elasticsearch together, so evaluating many queries costs a
+        single round-trip.
+        
+        Args:
+            searches: (query, category, size) tuples, with the same meaning as
+                the arguments of search_documents()
             
-            return [hit["_source"] for hit in response["hits"]["hits"]]
+        Returns:
+            List of search results for each search, in the same order (empty
+            for a search that failed)
+        """
+        results = [self._search_cache.get(tuple(search)) for search in searches]
+        pending = [i for i, cached in enumerate(results) if cached is None]
+        
+        if pending:
+            try:
+                body = []
+                for i in pending:
+                    body.append({"index": self.index_name})
+                    body.append(self._search_body(*searches[i]))
+                
+                response = self.es.msearch(searches=body)
+                
+                for i, item in zip(pending, response["responses"]):
+                    if "error" in item:
+                        print(f"Error searching documents: {item['error']}")
+                        results[i] = []
+                        continue
+                    
+                    results[i] = [hit["_source"] for hit in item["hits"]["hits"]]
+                    self._search_cache.set(tuple(searches[i]), results[i])
+                
+            except Exception as e:
+                print(f"Error searching documents: {e}")
+                for i in pending:
+                    results[i] = []
+        
+        # Callers may score or edit the hits in place, so they get their own
+        # copies of the (flat) source dicts rather than the cached ones
+        return [[dict(hit) for hit in hits] for hits in results]
+    
+    @staticmethod
+    def _search_body(query: str, category: Optional[str], size: int) -> Dict[str, Any]:
+        """
+        Build the request body of a search.
+        
+        Args:
+            query: Search query
+            category: Optional category filter
+            size: Number of results to return
             
-        except Exception as e:
-            print(f"Error searching documents: {e}")
-            return []
+        Returns:
+            Search request body
+        """
+        search_body = {
+            "query": {
+                "bool": {
+                    "must": [
+                        {"match": {"query": query}}
+                    ]
+                }
+            },
+            "size": size,
+            "sort": [{"rank": {"order": "asc"}}]
+        }
+        
+        if category:
+            search_body["query"]["bool"]["filter"] = [
+                {"term": {"category": category}}
+            ]
+        
+        return search_body
+
+
+@lru_cache(maxsize=1)
+def get_client() -> ElasticsearchClient:
+    """
+    Get the client shared by the whole process.
+    
+    Reusing one client keeps its connection pool, so later requests skip
+    the DNS lookup and TLS handshake of a new connection.
+    
+    Returns:
+        Shared ElasticsearchClient instance
+    """
+    return ElasticsearchClient()
 
 
-def index_to_elastic(json_docs: List[Dict[str, Any]]) -> bool:
+def index_to_elastic(json_docs: List[Dict[str, Any]], query: Optional[str] = None) -> bool:
     """
     Convenience function to index documents to Elasticsearch.
     
     Args:
         json_docs: List of structured JSON documents
+        query: The query of every document, when they all have the same one
         
     Returns:
         True if indexing successful
     """
-    client = ElasticsearchClient()
+    client = get_client()
     client.create_index_if_not_exists()
-    return client.index_to_elastic(json_docs)
+    return client.index_to_elastic(json_docs, query)
@@ -1,16 +1,43 @@
 """
 SerpAPI client with pagination support for real Google search results.
 """
-from serpapi import GoogleSearch
-from typing import List, Dict, Any
-from config import SERPAPI_KEY, RESULTS_PER_PAGE
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator
+
+import requests
+
+from ..config import get_config, RESULTS_PER_PAGE
+from ..jsonl_io import loads
+from ..ttl_cache import TTLCache
+
+# SerpAPI search endpoint
+SERPAPI_URL = "https://serpapi.com/search"
+
+# Seconds to wait for SerpAPI to answer one page request
+REQUEST_TIMEOUT = 60
+
+# Shared by every client and thread, so page requests reuse open connections
+# instead of each paying for a new TCP and TLS handshake
+_SESSION = requests.Session()
+
+# Recent SerpAPI responses keyed by (query, start); every hit saves a
+# round-trip and a billed search
+_PAGE_CACHE = TTLCache(maxsize=2048, ttl=300)
 
 
 class GoogleSearchClient:
     """Client for interacting with SerpAPI to get real Google search results."""
 
-    def __init__(self):
-        self.api_key = SERPAPI_KEY
+    def __init__(self, use_cache: bool = True):
+        """
+        Initialize the client.
+
+        Args:
+            use_cache: Reuse responses for pages fetched in the last five
+                minutes instead of requesting them again
+        """
+        self.api_key = get_config().serpapi_key
+        self.use_cache = use_cache
 
     def fetch_google_results(self, query: str, num_pages: int = 5) -> List[Dict[str, Any]]:
         """
@@ -28,55 +55,8 @@ class GoogleSearchClient:
             ValueError: If no results found or API error occurs
         """
         all_results = []
-        global_position = 1  # Track global position across all pages
-
-        for page in range(num_pages):
-            start_index = page * RESULTS_PER_PAGE
-
-            params = {
-                "q": query,
-                "api_key": self.api_key,
-                "engine": "google",
-                "num": RESULTS_PER_PAGE,
-                "start": start_index,
-            }
-
-            try:
-                print(f"Fetching page {page + 1} (start={start_index})...")
-                search = GoogleSearch(params)
-                results = search.get_dict()
-
-                # Check for errors
-                if "error" in results:
-                    print(f"API Error: {results['error']}")
-                    break
-
-                # Extract organic results and inline videos
-                organic_results = results.get("organic_results", [])
-                inline_videos = results.get("inline_videos", [])
-
-                if not organic_results and not inline_videos:
-                    print(f"No more results found at page {page + 1}")
-                    break
-
-                print(f"  Found {len(organic_results)} organic results and {len(inline_videos)} inline videos")
-
-                # Process inline videos first (they usually appear near the top on page 1)
-                if inline_videos and page == 0:  # Videos typically only on first page
-                    for video in inline_videos:
-                        structured_video = self._convert_inline_video(video, global_position)
-                        all_results.append(structured_video)
-                        global_position += 1
-
-                # Process organic results
-                for result in organic_results:
-                    structured_result = self._convert_serpapi_result(result, global_position)
-                    all_results.append(structured_result)
-                    global_position += 1
-
-            except Exception as e:
-                print(f"Error fetching page {page + 1}: {e}")
-                break
+        for page_results in self.iter_result_pages(query, num_pages):
+            all_results.extend(page_results)
 
         if not all_results:
             raise ValueError(f"No search results found for query: '{query}'")
@@ -84,6 +64,117 @@ class GoogleSearchClient:
         print(f"Successfully fetched {len(all_results)} total results")
         return all_results
 
+    def iter_result_pages(self, query: str, num_pages: int = 5) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the search results from Google one page at a time.
+
+        All pages are requested up front, and each page is yielded as soon as
+        it and the pages before it have arrived, so callers can work on the
+        first pages while the rest are still being fetched. Stops at the first
+        page that fails or has no results.
+
+        Args:
+            query: Search query string
+            num_pages: Number of pages to fetch (default: 5)
+
+        Yields:
+            Structured search result items of each page, in Google's order
+        """
+        global_position = 1  # Track global position across all pages
+
+        # Every page's offset is known up front, so the pages are requested
+        # concurrently and then processed in page order
+        print(f"Fetching {num_pages} pages...")
+        with ThreadPoolExecutor(max_workers=max(1, num_pages)) as executor:
+            pages = [executor.submit(self._fetch_page, query, page) for page in range(num_pages)]
+
+            try:
+                for page, future in enumerate(pages):
+                    start_index = page * RESULTS_PER_PAGE
+                    page_results = []
+
+                    try:
+                        results = future.result()
+
+                        # Check for errors
+                        if "error" in results:
+                            print(f"API Error: {results['error']}")
+                            break
+
+                        # Extract organic results and inline videos
+                        organic_results = results.get("organic_results", [])
+                        inline_videos = results.get("inline_videos", [])
+
+                        if not organic_results and not inline_videos:
+                            print(f"No more results found at page {page + 1}")
+                            break
+
+                        print(f"  Page {page + 1} (start={start_index}): found {len(organic_results)} organic results and {len(inline_videos)} inline videos")
+
+                        # Process inline videos first (they usually appear near the top on page 1)
+                        if inline_videos and page == 0:  # Videos typically only on first page
+                            for video in inline_videos:
+                                structured_video = self._convert_inline_video(video, global_position)
+                                page_results.append(structured_video)
+                                global_position += 1
+
+                        # Process organic results
+                        for result in organic_results:
+                            structured_result = self._convert_serpapi_result(result, global_position)
+                            page_results.append(structured_result)
+                            global_position += 1
+
+                    except Exception as e:
+                        print(f"Error fetching page {page + 1}: {e}")
+                        break
+
+                    yield page_results
+            finally:
+                # Requests for pages past the last one used are not needed any more
+                for future in pages:
+                    future.cancel()
+
+    def _fetch_page(self, query: str, page: int) -> Dict[str, Any]:
+        """
+        Request one page of Google results from SerpAPI.
+
+        Args:
+            query: Search query string
+            page: Zero-based page number
+
+        Returns:
+            Raw SerpAPI response for the page
+        """
+        start_index = page * RESULTS_PER_PAGE
+        cache_key = (query, start_index)
+        if self.use_cache:
+            cached = _PAGE_CACHE.get(cache_key)
+            if cached is not None:
+                return cached
+
+        params = {
+            "q": query,
+            "api_key": self.api_key,
+            "engine": "google",
+            "num": RESULTS_PER_PAGE,
+            "start": start_index,
+            "output": "json",
+        }
+        # Error responses carry a JSON body with an "error" key as well
+        response = _SESSION.get(SERPAPI_URL, params=params, timeout=REQUEST_TIMEOUT)
+        results = loads(response.content)
+
+        # Only pages with results are kept; errors and empty pages (which may
+        # be transient) are always requested again
+        organic_results = results.get("organic_results", [])
+        inline_videos = results.get("inline_videos", [])
+        if "error" not in results and (organic_results or inline_videos):
+            _PAGE_CACHE.set(cache_key, {
+                "organic_results": organic_results,
+                "inline_videos": inline_videos,
+            })
+        return results
+
     def _convert_serpapi_result(self, result: Dict[str, Any], position: int) -> Dict[str, Any]:
         """
         Convert SerpAPI result format to match expected internal format.
@@ -174,16 +265,33 @@ class GoogleSearchClient:
             return False
 
 
-def fetch_google_results(query: str, num_pages: int = 5) -> List[Dict[str, Any]]:
+def fetch_google_results(query: str, num_pages: int = 5, use_cache: bool = True) -> List[Dict[str, Any]]:
     """
     Convenience function to fetch Google search results.
 
     Args:
         query: Search query string
         num_pages: Number of pages to fetch
+        use_cache: Reuse recently fetched pages
 
     Returns:
         List of structured search result items
     """
-    client = GoogleSearchClient()
+    client = GoogleSearchClient(use_cache)
     return client.fetch_google_results(query, num_pages)
+
+
+def iter_result_pages(query: str, num_pages: int = 5, use_cache: bool = True) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Convenience function to fetch Google search results page by page.
+
+    Args:
+        query: Search query string
+        num_pages: Number of pages to fetch
+        use_cache: Reuse recently fetched pages
+
+    Yields:
+        Structured search result items of each page
+    """
+    client = GoogleSearchClient(use_cache)
+    yield from client.iter_result_pages(query, num_pages)
@@ -0,0 +1,269 @@
+"""
+JSONL helpers shared by the conversion and export scripts.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both backends accept bytes for parsing and produce UTF-8 encoded
+bytes when serializing, so callers can work with files opened in binary mode.
+"""
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Size of the blocks read from input files (1 MiB)
+READ_BLOCK_SIZE = 1 << 20
+
+# Buffered output is written out once it grows past this size (4 MiB)
+WRITE_BUFFER_SIZE = 4 << 20
+
+
+if orjson is not None:
+    loads = orjson.loads
+    dumps = orjson.dumps
+    JSONDecodeError = orjson.JSONDecodeError
+else:
+    loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+    # json.dumps() builds a new encoder per call when given options, so keep
+    # one configured like orjson (non-ASCII kept as UTF-8, compact separators)
+    _encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize an object to compact UTF-8 encoded JSON bytes."""
+        return _encode(obj).encode('utf-8')
+
+
+def iter_line_blocks(
+    infile: BinaryIO,
+    block_size: int = READ_BLOCK_SIZE,
+    limit: Optional[int] = None
+) -> Iterator[List[bytes]]:
+    """
+    Yield the lines of a binary file in batches, one batch per block read.
+
+    The file is read in large blocks and each block is split in a single
+    call, which avoids the per-line overhead of iterating the file object.
+    A line that spans several blocks is collected piece by piece and joined
+    once, so arbitrarily long lines stay linear in cost. Lines are returned
+    without their trailing newline.
+
+    Args:
+        infile: File opened in binary mode
+        block_size: Number of bytes to read per block
+        limit: Stop after reading this many bytes from the current position
+
+    Yields:
+        Lists of complete lines as bytes (a final line without a newline is
+        included in the last batch)
+    """
+    pending = []
+    remaining = limit
+
+    while True:
+        if remaining is None:
+            block = infile.read(block_size)
+        elif remaining > 0:
+            block = infile.read(min(block_size, remaining))
+            remaining -= len(block)
+        else:
+            break
+        if not block:
+            break
+
+        lines = block.split(b"\n")
+        if len(lines) == 1:
+            # No newline in this block, keep accumulating the current line
+            pending.append(block)
+            continue
+
+        if pending:
+            pending.append(lines[0])
+            lines[0] = b"".join(pending)
+            pending = []
+
+        tail = lines.pop()
+        if tail:
+            pending.append(tail)
+
+        yield lines
+
+    if pending:
+        yield [b"".join(pending)]
+
+
+def iter_lines(
+    infile: BinaryIO,
+    block_size: int = READ_BLOCK_SIZE,
+    limit: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Yield the lines of a binary file one at a time.
+
+    Same as iter_line_blocks() but flattened; see there for the arguments.
+    """
+    for lines in iter_line_blocks(infile, block_size, limit):
+        yield from lines
+
+
+class JSONLWriter:
+    """Write JSON records to a binary file, one per line, in large batches."""
+
+    def __init__(self, outfile: BinaryIO, buffer_size: int = WRITE_BUFFER_SIZE):
+        """
+        Initialize the writer.
+
+        Args:
+            outfile: File opened in binary mode
+            buffer_size: Number of buffered bytes that triggers a write
+        """
+        self.outfile = outfile
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    def write(self, record: Any) -> None:
+        """Serialize a record and append it to the output buffer."""
+        buffer = self._buffer
+        buffer += dumps(record)
+        buffer += b"\n"
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write any buffered records to the underlying file."""
+        if self._buffer:
+            self.outfile.write(self._buffer)
+            self._buffer.clear()
+
+    def __enter__(self) -> "JSONLWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+
+
+def count_newlines(path: str, end: int) -> int:
+    """
+    Count the newlines in the first bytes of a file.
+
+    Args:
+        path: Path to the file
+        end: Number of bytes from the start of the file to scan
+
+    Returns:
+        Number of newline characters before offset end
+    """
+    count = 0
+    remaining = end
+
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            count += block.count(b"\n")
+
+    return count
+
+
+def split_line_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges that each start at the beginning of a line.
+
+    Args:
+        path: Path to the file
+        parts: Desired number of ranges (fewer are returned for small files)
+
+    Returns:
+        List of (start, end) offsets covering the whole file in order
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+
+    with open(path, "rb") as f:
+        for k in range(1, parts):
+            offset = size * k // parts
+            if offset <= bounds[-1]:
+                continue
+
+            # Move to the start of the first line beginning at or after offset
+            f.seek(offset - 1)
+            f.readline()
+            position = f.tell()
+
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def map_line_ranges(
+    worker: Callable[[str, Any, int, int], Any],
+    input_file: str,
+    output_file: Union[str, Sequence[str]],
+    workers: int = 1
+) -> List[Any]:
+    """
+    Run a conversion worker over line-aligned byte ranges of a JSONL file.
+
+    The worker is called as worker(input_file, output_file, start, end) and
+    converts the lines in input_file[start:end] into output_file. With one
+    worker the whole file is converted in-process straight into output_file.
+    Otherwise every range is converted in its own process into a temporary
+    part file and the parts are concatenated in order, so the output is the
+    same as for a sequential run. The worker must be a module-level callable
+    (or a functools.partial of one) so it can be sent to other processes.
+
+    Args:
+        worker: Callable converting one byte range
+        input_file: Path to the input JSONL file
+        output_file: Path to the output JSONL file, or a tuple of paths for
+            workers that write several outputs (the worker then receives a
+            tuple of part paths in the same order)
+        workers: Number of worker processes
+
+    Returns:
+        List of the values returned by the worker, in file order
+    """
+    if workers <= 1:
+        return [worker(input_file, output_file, 0, os.path.getsize(input_file))]
+
+    single_output = isinstance(output_file, str)
+    output_files = (output_file,) if single_output else tuple(output_file)
+
+    ranges = split_line_ranges(input_file, workers)
+    part_files = [
+        tuple(f"{path}.part{k}" for path in output_files)
+        for k in range(len(ranges))
+    ]
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(worker, input_file, parts[0] if single_output else parts, start, end)
+                for parts, (start, end) in zip(part_files, ranges)
+            ]
+            results = [future.result() for future in futures]
+
+        for index, path in enumerate(output_files):
+            with open(path, "wb") as outfile:
+                for parts in part_files:
+                    with open(parts[index], "rb") as part:
+                        shutil.copyfileobj(part, outfile, READ_BLOCK_SIZE)
+    finally:
+        for parts in part_files:
+            for part_file in parts:
+                if os.path.exists(part_file):
+                    os.remove(part_file)
+
+    return results
@@ -1,7 +1,8 @@
 """
 Result parsing and categorization module.
 """
-from typing import Dict, List, Any, Optional
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator, Optional
 
 
 class ResultParser:
@@ -63,7 +64,13 @@ class ResultParser:
         return None
     
     @staticmethod
-    def structure_json_document(item: Dict[str, Any], query: str, category: str, rank: int) -> Dict[str, Any]:
+    def structure_json_document(
+        item: Dict[str, Any],
+        query: str,
+        category: str,
+        rank: int,
+        timestamp: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Structure a search result item into a clean JSON document.
         
@@ -72,6 +79,8 @@ class ResultParser:
             query: Original search query
             category: 'video' or 'article'
             rank: Original rank from Google
+            timestamp: ISO timestamp to record (defaults to the current time;
+                pass one in to share it across a batch of documents)
             
         Returns:
             Structured JSON document
@@ -83,27 +92,19 @@ class ResultParser:
         url = item.get('link', '')
         snippet = item.get('snippet', 'No description available')
         
-        # Extract optional fields
-        thumbnail_url = None
-        author = None
+        # Extract optional fields, reading the first metatags entry only once
+        meta = (pagemap.get('metatags') or [{}])[0]
         
         # Try to get thumbnail from pagemap or image
         if 'imageobject' in pagemap:
-            images = pagemap['imageobject']
-            if images and len(images) > 0:
-                thumbnail_url = images[0].get('url')
-        elif 'metatags' in pagemap:
-            metatags = pagemap['metatags']
-            if metatags and len(metatags) > 0:
-                thumbnail_url = metatags[0].get('og:image') or metatags[0].get('twitter:image')
+            thumbnail_url = (pagemap['imageobject'] or [{}])[0].get('url')
+        else:
+            thumbnail_url = meta.get('og:image') or meta.get('twitter:image')
         
         # Try to get author information
-        if 'metatags' in pagemap:
-            metatags = pagemap['metatags']
-            if metatags and len(metatags) > 0:
-                author = (metatags[0].get('article:author') or 
-                         metatags[0].get('author') or 
-                         metatags[0].get('og:site_name'))
+        author = (meta.get('article:author') or 
+                  meta.get('author') or 
+                  meta.get('og:site_name'))
         
         # Build structured document
         document = {
@@ -114,7 +115,7 @@ class ResultParser:
             'description': snippet,
             'source': 'google',
             'rank': rank,
-            'timestamp': ResultParser._get_current_timestamp()
+            'timestamp': timestamp or ResultParser.current_timestamp()
         }
         
         # Add optional fields if available
@@ -126,9 +127,40 @@ class ResultParser:
         return document
     
     @staticmethod
-    def _get_current_timestamp() -> str:
-        """Get current timestamp in ISO format."""
-        from datetime import datetime
+    def iter_structured(
+        items: Iterable[Dict[str, Any]],
+        query: str,
+        timestamp: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Categorize and structure search results in a single pass.
+        
+        Gives each document the same category and rank as categorize_results()
+        followed by structure_json_document() would, without building the
+        intermediate lists. Documents are yielded in the order of the items.
+        
+        Args:
+            items: Raw search result items, in Google's order
+            query: Original search query
+            timestamp: ISO timestamp to record on every document (see
+                current_timestamp())
+            
+        Yields:
+            Structured JSON documents
+        """
+        ranks = {'video': 0, 'article': 0}
+        
+        for item in items:
+            # Items without a clear classification are treated as articles
+            category = ResultParser._classify_item(item) or 'article'
+            ranks[category] += 1
+            yield ResultParser.structure_json_document(
+                item, query, category, ranks[category], timestamp
+            )
+    
+    @staticmethod
+    def current_timestamp() -> str:
+        """Get current timestamp in ISO format, as recorded on documents."""
         return datetime.utcnow().isoformat() + 'Z'
 
 
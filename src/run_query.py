@@ -4,23 +4,74 @@ Command-line interface for running search queries and indexing results.
 """
 import sys
 import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any
 from datetime import datetime
+from itertools import chain
 
-from config import validate_config, validate_cloud_config
-from google_client.search_client import fetch_google_results
-from parsers.result_parser import categorize_results, ResultParser
-from elasticsearch_client.es_client import index_to_elastic
-from scoring import RelevanceScorer
+from .config import validate_config, validate_cloud_config
+from .google_client.search_client import iter_result_pages
+from .parsers.result_parser import ResultParser
+from .elasticsearch_client.es_client import ElasticsearchClient, get_client
+from .scoring import RelevanceScorer
 
+# Scorer for every query processed; its settings never change between queries
+SCORER = RelevanceScorer(
+    base_weight=0.6,
+    recency_weight=0.4,
+    decay_days=30,
+    default_engagement=0.5
+)
 
-def process_query(query: str, num_pages: int = 5) -> bool:
+
+def prepare_index() -> ElasticsearchClient:
+    """
+    Make sure the results index exists.
+    
+    Returns:
+        Shared client, ready to index documents
+    """
+    client = get_client()
+    client.create_index_if_not_exists()
+    return client
+
+
+def process_query(query: str, num_pages: int = 5, use_cache: bool = True, score: bool = True) -> bool:
     """
     Process a search query through the complete pipeline.
     
     Args:
         query: Search query string
         num_pages: Number of pages to fetch from Google
+        use_cache: Reuse SerpAPI pages fetched in the last five minutes
+        score: Add relevance scores to the documents before indexing them
+        
+    Returns:
+        True if processing successful, False otherwise
+    """
+    # The index is prepared in the background while results are fetched from
+    # SerpAPI, so the Elasticsearch round-trips overlap the search requests
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        index_ready = pool.submit(prepare_index)
+        return _run_pipeline(query, num_pages, use_cache, score, index_ready)
+
+
+def _run_pipeline(
+    query: str,
+    num_pages: int,
+    use_cache: bool,
+    score: bool,
+    index_ready: Future
+) -> bool:
+    """
+    Fetch, structure, score and index the results for a query.
+    
+    Args:
+        query: Search query string
+        num_pages: Number of pages to fetch from Google
+        use_cache: Reuse recently fetched SerpAPI pages
+        score: Add relevance scores before indexing
+        index_ready: Future resolving to the client used for indexing
         
     Returns:
         True if processing successful, False otherwise
@@ -29,81 +80,82 @@ def process_query(query: str, num_pages: int = 5) -> bool:
         print(f"Processing query: '{query}'")
         print("=" * 50)
         
-        # Step 1: Fetch results from Google via SerpAPI
-        print("Step 1: Fetching results from Google via SerpAPI...")
-        raw_results = fetch_google_results(query, num_pages)
-        
-        # Step 2: Categorize results into videos and articles
-        print("Step 2: Categorizing results...")
-        categorized_results = categorize_results(raw_results)
-        
-        videos = categorized_results['videos']
-        articles = categorized_results['articles']
-        
-        print(f"Found {len(videos)} videos and {len(articles)} articles")
-        
-        # Step 3: Structure results into clean JSON documents
-        print("Step 3: Structuring results into JSON documents...")
-        structured_docs = []
-        
+        # Step 1: Fetch results from Google via SerpAPI, categorizing and
+        # structuring each page while the later pages are still being fetched
+        print("Step 1: Fetching and structuring results from Google via SerpAPI...")
         parser = ResultParser()
+        timestamp = parser.current_timestamp()  # One fetch time for the whole batch
+        video_docs = []
+        article_docs = []
         
-        # Process videos
-        for i, video in enumerate(videos):
-            doc = parser.structure_json_document(
-                video, query, 'video', i + 1
-            )
-            structured_docs.append(doc)
+        raw_results = chain.from_iterable(iter_result_pages(query, num_pages, use_cache))
+        for doc in parser.iter_structured(raw_results, query, timestamp):
+            if doc['category'] == 'video':
+                video_docs.append(doc)
+            else:
+                article_docs.append(doc)
         
-        # Process articles
-        for i, article in enumerate(articles):
-            doc = parser.structure_json_document(
-                article, query, 'article', i + 1
-            )
-            structured_docs.append(doc)
-        
-        print(f"Created {len(structured_docs)} structured documents")
+        if not video_docs and not article_docs:
+            raise ValueError(f"No search results found for query: '{query}'")
         
-        # Step 4: Calculate relevance scores for all documents
-        print("Step 4: Computing relevance scores...")
-        scorer = RelevanceScorer(
-            base_weight=0.6,
-            recency_weight=0.4,
-            decay_days=30,
-            default_engagement=0.5
-        )
+        print(f"Found {len(video_docs)} videos and {len(article_docs)} articles")
         
-        current_date = datetime.now()
-        scored_docs = []
+        # Videos are listed before articles, as they were categorized
+        structured_docs = video_docs + article_docs
+        print(f"Created {len(structured_docs)} structured documents")
         
-        for doc in structured_docs:
+        if score:
+            # Step 2: Calculate relevance scores for all documents
+            print("Step 2: Computing relevance scores...")
+            current_date = datetime.now()
+            
             try:
-                # Add relevance scores to the document
-                scored_doc = scorer.enrich_document(doc, current_date)
-                scored_docs.append(scored_doc)
+                # Score every document in one vectorized call, in place since
+                # the structured documents are not used anywhere else
+                enriched_docs, failed_indices = SCORER.enrich_documents(
+                    structured_docs, current_date, mutate=True
+                )
             except Exception as e:
-                print(f"  Warning: Could not score document (rank {doc.get('rank')}): {e}")
-                # Still add the document without scores
-                scored_docs.append(doc)
-        
-        print(f"  ✓ Computed scores for {len(scored_docs)} documents")
+                print(f"  Warning: Could not score documents: {e}")
+                enriched_docs, failed_indices = [], list(range(len(structured_docs)))
+            
+            # Documents that could not be scored are still indexed, in place
+            failed = set(failed_indices)
+            enriched = iter(enriched_docs)
+            scored_docs = [
+                doc if i in failed else next(enriched)
+                for i, doc in enumerate(structured_docs)
+            ]
+            
+            for i in failed_indices:
+                print(f"  Warning: Could not score document (rank {structured_docs[i].get('rank')})")
+            
+            print(f"  ✓ Computed scores for {len(enriched_docs)} documents")
+        else:
+            print("Step 2: Skipping relevance scores")
+            scored_docs = structured_docs
         
-        # Step 5: Index documents to Elasticsearch (with scores)
-        print("Step 5: Indexing documents to Elasticsearch...")
-        success = index_to_elastic(scored_docs)
+        # Step 3: Index documents to Elasticsearch
+        print("Step 3: Indexing documents to Elasticsearch...")
+        # Every document has the same query, which sets their ids and routing
+        success = index_ready.result().index_to_elastic(scored_docs, query)
         
         if success:
             print("=" * 50)
             print("Pipeline completed successfully!")
-            print(f"Indexed {len(scored_docs)} documents with relevance scores:")
-            print(f"   - {len(videos)} videos")
-            print(f"   - {len(articles)} articles")
-            print()
-            print("Score fields added to each document:")
-            print("   • base_rank_score")
-            print("   • recency_score")
-            print("   • relevance_score")
-            print("   • user_engagement_score")
+            if score:
+                print(f"Indexed {len(scored_docs)} documents with relevance scores:")
+            else:
+                print(f"Indexed {len(scored_docs)} documents:")
+            print(f"   - {len(video_docs)} videos")
+            print(f"   - {len(article_docs)} articles")
+            if score:
+                print()
+                print("Score fields added to each document:")
+                print("   • base_rank_score")
+                print("   • recency_score")
+                print("   • relevance_score")
+                print("   • user_engagement_score")
             return True
         else:
             print("Failed to index documents to Elasticsearch")
@@ -129,6 +181,17 @@ def main():
         default=5,
         help="Number of pages to fetch from Google (default: 5)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always request fresh results from SerpAPI instead of reusing recent pages"
+    )
+    parser.add_argument(
+        "--score",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Add relevance scores to the indexed documents (default: on)"
+    )
     parser.add_argument(
         "--validate-config",
         action="store_true",
@@ -156,7 +219,9 @@ def main():
             return 0 if cloud_success else 1
         
         # Process the query
-        success = process_query(args.query, args.pages)
+        success = process_query(
+            args.query, args.pages, use_cache=not args.no_cache, score=args.score
+        )
         return 0 if success else 1
         
     except ValueError as e:
@@ -3,7 +3,103 @@ Scoring module for computing relevance scores for ranking model.
 """
 import math
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# pyarrow is only needed to export scores with to_parquet()
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from .scoring_kernels import get_score_batch
+
+# Length of a day in the integer epoch units used by enrich_batch
+_MICROSECONDS_PER_DAY = 86_400_000_000
+
+# Entries kept in each of a scorer's memo caches; a full cache is emptied
+# and refilled, which keeps memory bounded without tracking usage
+CACHE_SIZE = 4096
+
+# Batches of at least this many documents use the compiled kernel (when
+# numba is installed); below that the NumPy expressions are faster and
+# numba is never imported
+KERNEL_MIN_DOCS = 10_000
+
+# Fields enrich_document() adds to every document
+SCORE_FIELDS = ('base_rank_score', 'recency_score', 'relevance_score', 'user_engagement_score')
+
+# Document fields exported next to the scores by to_parquet()
+PARQUET_FIELDS = ('query', 'category', 'title', 'url', 'rank', 'timestamp')
+
+# Scaled scores below this size are rounded without calling round()
+_MAX_EXACT_SCALED = 2.0 ** 40
+
+# Functions called once per document, bound to module names so the
+# per-document paths skip the attribute lookups
+_exp = math.exp
+_floor = math.floor
+_fromisoformat = datetime.fromisoformat
+
+
+def round_scores(values) -> List[float]:
+    """
+    Round an array of scores to 6 decimal places, as a list of floats.
+    
+    The array is rounded in one vectorized step the way np.round() does it,
+    which only differs from the built-in round() for values within rounding
+    error of a tie (or too large to scale exactly). Those few values are
+    rounded with round() instead, so every result is exactly round(x, 6).
+    
+    Args:
+        values: Array of scores
+        
+    Returns:
+        List of rounded scores
+    """
+    values = np.asarray(values, dtype=np.float64)
+    
+    with np.errstate(over='ignore', invalid='ignore'):
+        scaled = values * 1e6
+        rounded = (np.rint(scaled) / 1e6).tolist()
+        
+        # Written as negations so NaN and infinite values count as unsafe
+        fraction = scaled - np.floor(scaled)
+        unsafe = ~(np.abs(fraction - 0.5) > 1e-3) | ~(np.abs(scaled) < _MAX_EXACT_SCALED)
+    
+    for i in np.flatnonzero(unsafe).tolist():
+        rounded[i] = round(float(values[i]), 6)
+    
+    return rounded
+
+
+def round_score(value: float) -> float:
+    """
+    Round a single score to 6 decimal places, exactly like round(value, 6).
+    
+    Scalar counterpart of round_scores(): the scaled value is rounded with
+    plain float arithmetic, and round() is only called for values within
+    rounding error of a tie (or outside the range that scales exactly).
+    
+    Args:
+        value: Score to round
+        
+    Returns:
+        Rounded score
+    """
+    scaled = value * 1e6
+    # Scores are positive; zero and negative values keep round()'s signed zeros
+    if 0.0 < scaled < _MAX_EXACT_SCALED:
+        whole = _floor(scaled)
+        fraction = scaled - whole
+        if abs(fraction - 0.5) > 1e-3:
+            return (whole + (fraction > 0.5)) / 1e6
+    return round(value, 6)
 
 
 class RelevanceScorer:
@@ -25,11 +121,38 @@ class RelevanceScorer:
             decay_days: Number of days for recency decay (default: 30)
             default_engagement: Default user engagement score (default: 0.5)
         """
+        # Documents often share timestamps, so parsed timestamp strings and
+        # recency scores per (timestamp, reference date) are memoized
+        self._ts_cache: Dict[str, datetime] = {}
+        self._recency_cache: Dict[Tuple[str, datetime], float] = {}
+        
         self.base_weight = base_weight
         self.recency_weight = recency_weight
         self.decay_days = decay_days
         self.default_engagement = default_engagement
     
+    @property
+    def decay_days(self) -> float:
+        """Number of days for recency decay."""
+        return self._decay_days
+    
+    @decay_days.setter
+    def decay_days(self, decay_days: float) -> None:
+        self._decay_days = decay_days
+        
+        # Float copy used by every scoring path, so dividing by it never has
+        # to convert an int first (a precomputed reciprocal would round
+        # differently from the division and change scores)
+        self._decay = float(decay_days)
+        
+        # Memoized recency scores were computed with the old decay
+        self._recency_cache.clear()
+    
+    def reset_caches(self) -> None:
+        """Drop memoized timestamps and recency scores (for long-running workers)."""
+        self._ts_cache.clear()
+        self._recency_cache.clear()
+    
     def calculate_base_rank_score(self, rank: int) -> float:
         """
         Calculate base rank score using inverse rank.
@@ -44,6 +167,53 @@ class RelevanceScorer:
             raise ValueError("Rank must be positive")
         return 1.0 / rank
     
+    @staticmethod
+    def _parse_timestamp(timestamp) -> datetime:
+        """
+        Parse a document timestamp into a naive datetime.
+        
+        Args:
+            timestamp: ISO format string or datetime object
+            
+        Returns:
+            Datetime with any timezone info removed
+        """
+        # Parse timestamp if it's a string; only a trailing 'Z' needs
+        # rewriting, other ISO strings (with or without an offset) parse as-is
+        if isinstance(timestamp, str):
+            if timestamp.endswith('Z'):
+                timestamp = timestamp[:-1] + '+00:00'
+            doc_date = _fromisoformat(timestamp)
+        else:
+            doc_date = timestamp
+        
+        # Remove timezone info for comparison if present
+        if doc_date.tzinfo:
+            doc_date = doc_date.replace(tzinfo=None)
+        
+        return doc_date
+    
+    def _parse_cached(self, timestamp) -> datetime:
+        """
+        Parse a document timestamp, reusing the result for repeated strings.
+        
+        Args:
+            timestamp: ISO format string or datetime object
+            
+        Returns:
+            Datetime with any timezone info removed
+        """
+        if not isinstance(timestamp, str):
+            return self._parse_timestamp(timestamp)
+        
+        doc_date = self._ts_cache.get(timestamp)
+        if doc_date is None:
+            doc_date = self._parse_timestamp(timestamp)
+            if len(self._ts_cache) >= CACHE_SIZE:
+                self._ts_cache.clear()
+            self._ts_cache[timestamp] = doc_date
+        return doc_date
+    
     def calculate_recency_score(
         self, 
         timestamp: str, 
@@ -59,33 +229,49 @@ class RelevanceScorer:
         Returns:
             Recency score (more recent = higher score)
         """
+        # Scores are only memoized against a fixed reference date, now()
+        # differs on every call
+        cacheable = current_date is not None and isinstance(timestamp, str)
+        
         if current_date is None:
             current_date = datetime.now()
         
-        # Parse timestamp if it's a string
-        if isinstance(timestamp, str):
-            try:
-                doc_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except ValueError:
-                # Try parsing without timezone info
-                doc_date = datetime.fromisoformat(timestamp)
-        else:
-            doc_date = timestamp
-        
         # Remove timezone info for comparison if present
-        if doc_date.tzinfo:
-            doc_date = doc_date.replace(tzinfo=None)
         if current_date.tzinfo:
             current_date = current_date.replace(tzinfo=None)
         
+        if cacheable:
+            key = (timestamp, current_date)
+            recency_score = self._recency_cache.get(key)
+            if recency_score is not None:
+                return recency_score
+        
+        doc_date = self._parse_cached(timestamp)
+        
         # Calculate days difference
         days_diff = (current_date - doc_date).days
         
-        # Apply exponential decay: exp(-days_diff / decay_days)
-        recency_score = math.exp(-days_diff / self.decay_days)
+        recency_score = self.calculate_recency_score_from_age(days_diff)
         
+        if cacheable:
+            if len(self._recency_cache) >= CACHE_SIZE:
+                self._recency_cache.clear()
+            self._recency_cache[key] = recency_score
         return recency_score
     
+    def calculate_recency_score_from_age(self, days_old: float) -> float:
+        """
+        Calculate recency score from a document age that is already known.
+        
+        Args:
+            days_old: Age of the document in days
+            
+        Returns:
+            Recency score (more recent = higher score)
+        """
+        # Apply exponential decay: exp(-days_old / decay_days)
+        return _exp(-days_old / self._decay)
+    
     def calculate_relevance_score(
         self, 
         rank: int, 
@@ -116,20 +302,26 @@ class RelevanceScorer:
     def enrich_document(
         self, 
         document: Dict[str, Any],
-        current_date: datetime = None
+        current_date: datetime = None,
+        mutate: bool = False
     ) -> Dict[str, Any]:
         """
         Enrich a document with calculated scores.
         
         Args:
             document: Original document from Elasticsearch
-            current_date: Reference date for recency calculation
+            current_date: Reference date for recency calculation (defaults
+                to now; only scores for a given date are memoized)
+            mutate: Write the scores into document itself instead of a copy,
+                for callers that own the document
             
         Returns:
             Document enriched with scores
         """
-        # Make a copy to avoid modifying the original
-        enriched_doc = document.copy()
+        # Make a copy to avoid modifying the original (the scores are only
+        # written once all of them are computed, so a failure leaves a
+        # mutated document untouched)
+        enriched_doc = document if mutate else document.copy()
         
         # Extract rank and timestamp
         rank = document.get('rank', 1)
@@ -138,16 +330,287 @@ class RelevanceScorer:
         if timestamp is None:
             raise ValueError("Document missing 'timestamp' field")
         
-        # Calculate scores
+        # Calculate scores (relevance is combined from the two component
+        # scores rather than recomputing them via calculate_relevance_score,
+        # so a missing current_date is only replaced by now() once, inside
+        # calculate_recency_score, which then skips the memo cache)
         base_rank_score = self.calculate_base_rank_score(rank)
         recency_score = self.calculate_recency_score(timestamp, current_date)
-        relevance_score = self.calculate_relevance_score(rank, timestamp, current_date)
+        relevance_score = (
+            self.base_weight * base_rank_score +
+            self.recency_weight * recency_score
+        )
         
         # Add scores to document
-        enriched_doc['base_rank_score'] = round(base_rank_score, 6)
-        enriched_doc['recency_score'] = round(recency_score, 6)
-        enriched_doc['relevance_score'] = round(relevance_score, 6)
+        enriched_doc['base_rank_score'] = round_score(base_rank_score)
+        enriched_doc['recency_score'] = round_score(recency_score)
+        enriched_doc['relevance_score'] = round_score(relevance_score)
         enriched_doc['user_engagement_score'] = self.default_engagement
         
         return enriched_doc
 
+    
+    def enrich_batch(
+        self,
+        ranks: Sequence[int],
+        timestamps: Sequence[Any],
+        current_date: datetime = None
+    ) -> Dict[str, Any]:
+        """
+        Calculate scores for many documents at once with NumPy.
+        
+        Produces the same values as calling the per-document methods on
+        every rank/timestamp pair (before rounding), but evaluates the
+        formulas as whole-array operations.
+        
+        Args:
+            ranks: Positions in search results (1-indexed)
+            timestamps: Document timestamps (ISO strings, datetime objects
+                or a datetime64 array)
+            current_date: Reference date for recency calculation (defaults to now)
+            
+        Returns:
+            Dictionary of float64 arrays keyed by 'base_rank_score',
+            'recency_score' and 'relevance_score'
+        """
+        if np is None:
+            raise ImportError("enrich_batch requires numpy (pip install numpy)")
+        
+        if current_date is None:
+            current_date = datetime.now()
+        if current_date.tzinfo:
+            current_date = current_date.replace(tzinfo=None)
+        
+        ranks = np.asarray(ranks, dtype=np.float64)
+        if np.any(ranks <= 0):
+            raise ValueError("Rank must be positive")
+        
+        if not (isinstance(timestamps, np.ndarray) and timestamps.dtype.kind == 'M'):
+            timestamps = np.array(
+                [self._parse_cached(ts) for ts in timestamps],
+                dtype='datetime64[us]'
+            )
+        
+        # Work on integer microseconds since the epoch: the age is one int64
+        # subtraction and a floor division per document (floored like
+        # timedelta.days), with no datetime objects involved
+        doc_epoch = timestamps.astype('datetime64[us]').view(np.int64)
+        now_epoch = np.datetime64(current_date, 'us').astype(np.int64)
+        days_diff = (now_epoch - doc_epoch) // _MICROSECONDS_PER_DAY
+        
+        # numba is only imported (and the kernel compiled) for large batches
+        score_batch = get_score_batch() if len(ranks) >= KERNEL_MIN_DOCS else None
+        if score_batch is not None:
+            # One compiled pass instead of a temporary array per operation
+            base_rank_score = np.empty(len(ranks))
+            recency_score = np.empty(len(ranks))
+            relevance_score = np.empty(len(ranks))
+            score_batch(
+                ranks, days_diff, float(self.base_weight), float(self.recency_weight),
+                self._decay, base_rank_score, recency_score, relevance_score
+            )
+        else:
+            base_rank_score = 1.0 / ranks
+            recency_score = np.exp(-days_diff / self._decay)
+            relevance_score = (
+                self.base_weight * base_rank_score +
+                self.recency_weight * recency_score
+            )
+        
+        return {
+            'base_rank_score': base_rank_score,
+            'recency_score': recency_score,
+            'relevance_score': relevance_score
+        }
+    
+    def enrich_documents(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        current_date: datetime = None,
+        mutate: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Enrich many documents with calculated scores at once.
+        
+        The scores are computed with enrich_batch(), rounded with
+        round_scores() and written into copies of the documents. If that fails
+        because some documents cannot be scored (or NumPy is not installed),
+        the documents are enriched one at a time and the ones that fail are
+        left out.
+        
+        Args:
+            documents: Original documents
+            current_date: Reference date for recency calculation (defaults to now)
+            mutate: Write the scores into the documents themselves instead
+                of copies
+            
+        Returns:
+            Tuple of (enriched copies of the documents that could be scored,
+            in order, and the indices of the documents that could not)
+        """
+        if current_date is None:
+            current_date = datetime.now()
+        
+        if np is not None:
+            try:
+                return self._enrich_all(documents, current_date, mutate), []
+            except (ValueError, TypeError, AttributeError):
+                pass
+        
+        enriched_docs = []
+        failed_indices = []
+        
+        for i, doc in enumerate(documents):
+            try:
+                enriched_docs.append(self.enrich_document(doc, current_date, mutate))
+            except (ValueError, TypeError, AttributeError):
+                failed_indices.append(i)
+        
+        return enriched_docs, failed_indices
+    
+    def score_search_response(
+        self,
+        response: Dict[str, Any],
+        current_date: datetime = None
+    ) -> Dict[str, Any]:
+        """
+        Score every hit of an Elasticsearch search response in place.
+        
+        The hits are walked once to gather their ranks and timestamps, which
+        are scored with a single enrich_batch() call, and the scores are
+        written straight into each hit's _source (no document copies).
+        Without NumPy every hit is enriched with enrich_document() instead.
+        
+        Args:
+            response: Search response whose hits carry a _source
+            current_date: Reference date for recency calculation (defaults to now)
+            
+        Returns:
+            The same response, with scores added to every hit's _source
+            
+        Raises:
+            ValueError: If a hit has no timestamp or a non-positive rank
+        """
+        if current_date is None:
+            current_date = datetime.now()
+        
+        hits = response['hits']['hits']
+        
+        if np is None:
+            for hit in hits:
+                self.enrich_document(hit['_source'], current_date, mutate=True)
+            return response
+        
+        ranks = np.empty(len(hits), dtype=np.float64)
+        timestamps = [None] * len(hits)
+        
+        for i, hit in enumerate(hits):
+            source = hit['_source']
+            ranks[i] = source.get('rank', 1)
+            timestamp = source.get('timestamp')
+            if timestamp is None:
+                raise ValueError("Document missing 'timestamp' field")
+            timestamps[i] = timestamp
+        
+        scores = self.enrich_batch(ranks, timestamps, current_date)
+        engagement = self.default_engagement
+        
+        for hit, base_rank_score, recency_score, relevance_score in zip(
+            hits,
+            round_scores(scores['base_rank_score']),
+            round_scores(scores['recency_score']),
+            round_scores(scores['relevance_score'])
+        ):
+            source = hit['_source']
+            source['base_rank_score'] = base_rank_score
+            source['recency_score'] = recency_score
+            source['relevance_score'] = relevance_score
+            source['user_engagement_score'] = engagement
+        
+        return response
+    
+    def to_parquet(self, path: str, documents: Sequence[Dict[str, Any]]) -> int:
+        """
+        Write scored documents to a Parquet file for model training.
+        
+        The score columns are stored as float32, half the size of the
+        float64 values kept in the documents, which is ample precision for
+        scores rounded to 6 decimal places. The other exported fields keep
+        the types pyarrow infers for them.
+        
+        Args:
+            path: Output Parquet file
+            documents: Documents enriched with scores
+            
+        Returns:
+            Number of rows written
+            
+        Raises:
+            ImportError: If numpy or pyarrow is not installed
+            KeyError: If a document has not been scored
+        """
+        if np is None or pa is None:
+            raise ImportError("to_parquet requires numpy and pyarrow (pip install pyarrow)")
+        
+        columns = {
+            field: pa.array([doc.get(field) for doc in documents])
+            for field in PARQUET_FIELDS
+        }
+        for field in SCORE_FIELDS:
+            columns[field] = pa.array(np.fromiter(
+                (doc[field] for doc in documents),
+                dtype=np.float32,
+                count=len(documents)
+            ))
+        
+        pq.write_table(pa.table(columns), path)
+        return len(documents)
+    
+    def _enrich_all(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        current_date: datetime,
+        mutate: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Enrich every document with scores from a single enrich_batch() call.
+        
+        Args:
+            documents: Original documents
+            current_date: Reference date for recency calculation
+            mutate: Write the scores into the documents instead of copies
+            
+        Returns:
+            Enriched documents, in the same order
+            
+        Raises:
+            ValueError: If a document has no timestamp or a non-positive rank
+        """
+        timestamps = [doc.get('timestamp') for doc in documents]
+        if None in timestamps:
+            raise ValueError("Document missing 'timestamp' field")
+        
+        ranks = np.fromiter(
+            (doc.get('rank', 1) for doc in documents),
+            dtype=np.float64,
+            count=len(documents)
+        )
+        scores = self.enrich_batch(ranks, timestamps, current_date)
+        
+        engagement = self.default_engagement
+        enriched_docs = []
+        
+        for doc, base_rank_score, recency_score, relevance_score in zip(
+            documents,
+            round_scores(scores['base_rank_score']),
+            round_scores(scores['recency_score']),
+            round_scores(scores['relevance_score'])
+        ):
+            enriched_doc = doc if mutate else doc.copy()
+            enriched_doc['base_rank_score'] = base_rank_score
+            enriched_doc['recency_score'] = recency_score
+            enriched_doc['relevance_score'] = relevance_score
+            enriched_doc['user_engagement_score'] = engagement
+            enriched_docs.append(enriched_doc)
+        
+        return enriched_docs
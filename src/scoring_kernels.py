@@ -0,0 +1,83 @@
+"""
+Compiled scoring kernels for large document batches.
+
+The kernels are compiled with numba when it is installed. numba is only
+imported, and the kernel only compiled, the first time get_score_batch()
+is called, so importing the scoring module stays cheap for the small
+batches that never use it. Without numba get_score_batch() returns None
+and RelevanceScorer.enrich_batch uses plain NumPy.
+"""
+import math
+
+# Compiled kernel, filled in by the first get_score_batch() call
+_score_batch = None
+_loaded = False
+
+
+def get_score_batch():
+    """
+    Return the compiled batch scoring kernel, importing numba on first use.
+
+    Returns:
+        The score_batch kernel, or None if numba is not installed
+    """
+    global _score_batch, _loaded
+
+    if not _loaded:
+        _loaded = True
+        try:
+            from numba import njit, prange
+        except ImportError:
+            return None
+        _score_batch = _compile(njit, prange)
+
+    return _score_batch
+
+
+def _compile(njit, prange):
+    """
+    Build the batch scoring kernel with the given numba decorator.
+
+    Args:
+        njit: numba.njit
+        prange: numba.prange
+
+    Returns:
+        Compiled score_batch function
+    """
+    @njit(parallel=True, cache=True)
+    def score_batch(
+        ranks,
+        days,
+        base_weight,
+        recency_weight,
+        decay_days,
+        out_base,
+        out_recency,
+        out_relevance
+    ):
+        """
+        Compute the three scores of every document in one parallel pass.
+
+        Same formulas as the NumPy path, without its temporary arrays.
+        fastmath is left off so the operations are not reordered and the
+        scores stay the same as the other paths.
+
+        Args:
+            ranks: float64 array of positions in search results
+            days: int64 array of document ages in whole days
+            base_weight: Weight for base rank score
+            recency_weight: Weight for recency score
+            decay_days: Number of days for recency decay
+            out_base: float64 array receiving the base rank scores
+            out_recency: float64 array receiving the recency scores
+            out_relevance: float64 array receiving the relevance scores
+        """
+        for i in prange(ranks.shape[0]):
+            base = 1.0 / ranks[i]
+            recency = math.exp(-days[i] / decay_days)
+            out_base[i] = base
+            out_recency[i] = recency
+            out_relevance[i] = base_weight * base + recency_weight * recency
+
+    return score_batch
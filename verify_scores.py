@@ -2,14 +2,31 @@
 Quick script to verify if scores exist in Elasticsearch documents.
 """
 import sys
-from pathlib import Path
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+from elasticsearch import AuthenticationException, NotFoundError
+from elasticsearch import ConnectionError as ESConnectionError
 
 from src.elasticsearch_client.es_client import ElasticsearchClient
 from src.config import ELASTIC_INDEX
 
+# Fields every indexed document should have
+REQUIRED_FIELDS = ['query', 'title', 'rank', 'timestamp']
+
+# Fields added by relevance scoring
+SCORE_FIELDS = [
+    'base_rank_score',
+    'recency_score',
+    'relevance_score',
+    'user_engagement_score'
+]
+
+
+def print_connected():
+    """Report a working connection and the index being checked."""
+    print(f"✓ Connected to Elasticsearch")
+    print(f"  Index: {ELASTIC_INDEX}")
+    print()
+
 
 def main():
     """Check if documents have scoring fields."""
@@ -21,50 +38,48 @@ def main():
     # Connect to Elasticsearch
     client = ElasticsearchClient()
     
-    # Test connection
-    if not client.test_connection():
+    # One search answers everything: a missing index is reported as an
+    # error, track_total_hits gives the document count and the single hit
+    # is the sample document
+    try:
+        result = client.es.search(
+            index=ELASTIC_INDEX,
+            size=1,
+            body={
+                "query": {"match_all": {}},
+                "track_total_hits": True,
+                # Only the checked fields are returned, not the whole document
+                "_source": {"includes": REQUIRED_FIELDS + SCORE_FIELDS}
+            }
+        )
+    except (ESConnectionError, AuthenticationException) as e:
+        print(f"Elasticsearch connection test failed: {e}")
         print("❌ Failed to connect to Elasticsearch")
         print("   Check your .env configuration")
         return False
-    
-    print(f"✓ Connected to Elasticsearch")
-    print(f"  Index: {ELASTIC_INDEX}")
-    print()
-    
-    # Check if index exists
-    try:
-        if not client.es.indices.exists(index=ELASTIC_INDEX):
-            print(f"❌ Index '{ELASTIC_INDEX}' does not exist")
-            print("   Run: python main.py 'your query' --pages 5")
-            return False
+    except NotFoundError:
+        print_connected()
+        print(f"❌ Index '{ELASTIC_INDEX}' does not exist")
+        print("   Run: python main.py 'your query' --pages 5")
+        return False
     except Exception as e:
-        print(f"❌ Error checking index: {e}")
+        print(f"❌ Error fetching sample document: {e}")
         return False
     
+    print_connected()
+    
     # Get document count
-    try:
-        count_result = client.es.count(index=ELASTIC_INDEX)
-        total_docs = count_result['count']
-        print(f"📊 Total documents in index: {total_docs}")
-        
-        if total_docs == 0:
-            print()
-            print("⚠️  No documents found in index")
-            print("   Run: python main.py 'your query' --pages 5")
-            return False
-        
-    except Exception as e:
-        print(f"❌ Error counting documents: {e}")
+    total_docs = result['hits']['total']['value']
+    print(f"📊 Total documents in index: {total_docs}")
+    
+    if total_docs == 0:
+        print()
+        print("⚠️  No documents found in index")
+        print("   Run: python main.py 'your query' --pages 5")
         return False
     
-    # Get a sample document
+    # Check the sample document
     try:
-        result = client.es.search(
-            index=ELASTIC_INDEX,
-            size=1,
-            body={"query": {"match_all": {}}}
-        )
-        
         if result['hits']['hits']:
             doc = result['hits']['hits'][0]['_source']
             
@@ -74,8 +89,7 @@ def main():
             print("-" * 60)
             
             # Check for required fields
-            required_fields = ['query', 'title', 'rank', 'timestamp']
-            for field in required_fields:
+            for field in REQUIRED_FIELDS:
                 status = "✓" if field in doc else "❌"
                 value = doc.get(field, 'MISSING')
                 if isinstance(value, str) and len(value) > 40:
@@ -88,16 +102,9 @@ def main():
             print("-" * 60)
             
             # Check for score fields
-            score_fields = [
-                'base_rank_score',
-                'recency_score',
-                'relevance_score',
-                'user_engagement_score'
-            ]
-            
-            has_scores = all(field in doc for field in score_fields)
+            has_scores = all(field in doc for field in SCORE_FIELDS)
             
-            for field in score_fields:
+            for field in SCORE_FIELDS:
                 if field in doc:
                     print(f"✓ {field}: {doc[field]}")
                 else:
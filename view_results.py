@@ -3,65 +3,178 @@
 Script to view all indexed results from Elasticsearch.
 """
 import sys
-import os
 import json
+from typing import List
 
-# Add src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from src.elasticsearch_client.es_client import ElasticsearchClient
 
+# Number of hits fetched per request when listing results
+LISTING_BATCH_SIZE = 1000
+
+# Source fields needed for the readable listing
+LISTING_FIELDS = ["category", "rank", "title", "url", "author"]
+
+# Descriptions are cut to their listed length by the server
+DESCRIPTION_PREVIEW_LENGTH = 100
+SHORT_DESCRIPTION = {
+    "desc_short": {
+        "type": "keyword",
+        "script": {
+            "source": (
+                "def d = params._source.description; "
+                "if (d != null) { emit(d.substring(0, Math.min(params.length, d.length()))); }"
+            ),
+            "params": {"length": DESCRIPTION_PREVIEW_LENGTH}
+        }
+    }
+}
+
+
+def dump_json(obj) -> bytes:
+    """Serialize an object to indented UTF-8 JSON, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_lines(lines: List[str]):
+    """Write lines to stdout in one call and empty the list."""
+    if lines:
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
+        lines.clear()
+
+
+def iter_hits(client, search_query, batch_size: int = LISTING_BATCH_SIZE, source_includes=None, **options):
+    """
+    Yield every hit matching a query in rank order, one page at a time.
+
+    Pages are read from a point in time with search_after, so the listing is
+    consistent and not limited to a single response.
 
-def view_all_results(query: str = None, category: str = None):
-    """View all results from Elasticsearch."""
+    Args:
+        client: ElasticsearchClient to search with
+        search_query: Elasticsearch query clause
+        batch_size: Number of hits fetched per request
+        source_includes: Source fields to return (all fields when None)
+        **options: Extra search parameters sent with every page
+
+    Yields:
+        Search hits ordered by rank
+    """
+    pit_id = client.es.open_point_in_time(index=client.index_name, keep_alive="1m")["id"]
+    search_after = None
+
+    try:
+        while True:
+            response = client.es.search(
+                pit={"id": pit_id, "keep_alive": "1m"},
+                query=search_query,
+                size=batch_size,
+                sort=[{"rank": {"order": "asc"}}],
+                search_after=search_after,
+                source_includes=source_includes,
+                **options
+            )
+            pit_id = response.get("pit_id", pit_id)
+            hits = response["hits"]["hits"]
+            yield from hits
+
+            if len(hits) < batch_size:
+                break
+            # The point in time adds a tiebreaker, so equal ranks still page correctly
+            search_after = hits[-1]["sort"]
+    finally:
+        client.es.close_point_in_time(id=pit_id)
+
+
+def view_all_results(query: str = None, category: str = None, as_json: bool = False):
+    """
+    View all results from Elasticsearch.
+
+    Args:
+        query: Only show results for this query text
+        category: Only show results of this category
+        as_json: Write the matching documents to stdout as a JSON array
+            instead of printing a readable listing
+    """
     client = ElasticsearchClient()
 
     try:
         # Get all documents
-        search_body = {
-            "query": {"match_all": {}},
-            "size": 100,
-            "sort": [{"rank": {"order": "asc"}}]
-        }
+        search_query = {"match_all": {}}
 
         if query:
-            search_body["query"] = {"match": {"query": query}}
+            search_query = {"match": {"query": query}}
 
         if category:
-            search_body["query"] = {
+            search_query = {
                 "bool": {
-                    "must": [search_body["query"]],
+                    "must": [search_query],
                     "filter": [{"term": {"category": category}}]
                 }
             }
 
-        response = client.es.search(index=client.index_name, body=search_body)
-        hits = response["hits"]["hits"]
+        if as_json:
+            # The whole array is encoded at once and written as raw bytes
+            docs = [hit["_source"] for hit in iter_hits(client, search_query)]
+            sys.stdout.buffer.write(dump_json(docs))
+            sys.stdout.flush()
+            return
+
+        # Count and summarize on the server, without transferring any hits
+        summary = client.es.search(
+            index=client.index_name,
+            query=search_query,
+            size=0,
+            track_total_hits=True,
+            aggs={"by_category": {"terms": {"field": "category", "size": 50}}}
+        )
+        total = summary["hits"]["total"]["value"]
 
         print(f"\n{'='*80}")
-        print(f"Total documents found: {len(hits)}")
+        print(f"Total documents found: {total}")
         print(f"{'='*80}\n")
 
+        hits = iter_hits(
+            client, search_query, source_includes=LISTING_FIELDS,
+            runtime_mappings=SHORT_DESCRIPTION, fields=["desc_short"]
+        )
+        # Lines are collected and written once per page of hits rather than
+        # with a print() call each
+        lines = []
+        append = lines.append
         for i, hit in enumerate(hits, 1):
+            # Every field is looked up once per hit
             doc = hit["_source"]
-            print(f"{i}. [{doc['category'].upper()}] Rank {doc['rank']}")
-            print(f"   Title: {doc['title']}")
-            print(f"   URL: {doc['url']}")
-            if doc.get('author'):
-                print(f"   Author: {doc['author']}")
-            print(f"   Description: {doc['description'][:100]}...")
-            print()
+            category, rank, title, url, author = (
+                doc['category'], doc['rank'], doc['title'], doc['url'], doc.get('author')
+            )
+            description = hit.get("fields", {}).get("desc_short", [""])[0]
 
-        # Summary
-        categories = {}
-        for hit in hits:
-            cat = hit["_source"]["category"]
-            categories[cat] = categories.get(cat, 0) + 1
+            append(f"{i}. [{category.upper()}] Rank {rank}")
+            append(f"   Title: {title}")
+            append(f"   URL: {url}")
+            if author:
+                append(f"   Author: {author}")
+            append(f"   Description: {description}...")
+            append("")
+
+            if i % LISTING_BATCH_SIZE == 0:
+                write_lines(lines)
 
+        write_lines(lines)
+
+        # Summary
         print(f"{'='*80}")
         print(f"Summary:")
-        for cat, count in categories.items():
-            print(f"  {cat}: {count}")
+        for bucket in summary["aggregations"]["by_category"]["buckets"]:
+            print(f"  {bucket['key']}: {bucket['doc_count']}")
         print(f"{'='*80}\n")
 
     except Exception as e:
@@ -74,6 +187,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="View indexed search results")
     parser.add_argument("--query", help="Filter by query text")
     parser.add_argument("--category", choices=["video", "article"], help="Filter by category")
+    parser.add_argument("--json", action="store_true", help="Output the matching documents as JSON")
 
     args = parser.parse_args()
-    view_all_results(query=args.query, category=args.category)
+    view_all_results(query=args.query, category=args.category, as_json=args.json)